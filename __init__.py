@@ -12,6 +12,7 @@ from .node.condition_switcher import NODE_CLASS_MAPPINGS as CONDITION_SWITCHER_N
 from .node.latent_switcher import NODE_CLASS_MAPPINGS as LATENT_SWITCHER_NODES
 from .node.image_stroke import NODE_CLASS_MAPPINGS as IMAGE_STROKE_NODES
 from .node.image_splitter import NODE_CLASS_MAPPINGS as IMAGE_SPLITTER_NODES
+from .node.image_tile import NODE_CLASS_MAPPINGS as IMAGE_TILE_NODES
 from .node.txt_file_merger import NODE_CLASS_MAPPINGS as TXT_MERGER_NODES
 
 # 导入Qwen-MT翻译节点
@@ -40,6 +41,7 @@ NODE_CLASS_MAPPINGS = {
     **LATENT_SWITCHER_NODES,
     **IMAGE_STROKE_NODES,
     **IMAGE_SPLITTER_NODES,
+    **IMAGE_TILE_NODES,
     **TXT_MERGER_NODES,
     **QWEN_MT_NODES,
     **ASPECT_RATIO_NODES,
@@ -49,6 +51,7 @@ NODE_CLASS_MAPPINGS = {
 NODE_DISPLAY_NAME_MAPPINGS = {
     "DD-DimensionCalculator": "DD Dimension Calculator",
     "DD-ImageToVideo": "DD Image To Video",
+    "DD-ImageSequenceToVideo": "DD Image Sequence To Video",
     "DD-VideoFrameExtractor": "DD Video Frame Extractor",
     "DD-AdvancedFusion": "DD Advanced Fusion",
     "DD-SimpleLatent": "DD Simple Latent",
@@ -61,6 +64,8 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "DD-LatentSwitcher": "DD Latent Switcher",
     "DD-ImageStroke": "DD Image Stroke",
     "DD-ImageSplitter": "DD Image Splitter",
+    "DD-ImageTileSplitter": "DD Image Tile Splitter",
+    "DD-ImageTileMerger": "DD Image Tile Merger",
     "DD-TxtFileMerger": "DD TXT File Merger",
     "DD-QwenMTTranslator": "DD Qwen-MT",
     "DD-AspectRatioSelector": "DD Aspect Ratio Selector",
@@ -0,0 +1,87 @@
+"""
+DD 高级融合 峰值内存基准
+
+比较融合阶段改为广播掩码、分块写入预分配输出前后的峰值内存（ru_maxrss）。
+每种实现在独立子进程中运行，互不影响峰值统计。
+
+用法: python benchmarks/bench_fusion_memory.py [--frames 48] [--width 1280] [--height 720]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = {
+    "legacy": "改动前：掩码np.repeat到所有帧和通道后整体混合",
+    "numpy": "NumPy路径：广播掩码，分块写入预分配输出",
+    "torch": "torch路径：广播掩码，分块lerp写入预分配输出",
+}
+
+
+def legacy_fusion(node, frames_a, frames_b, blur):
+    """改动前的融合实现（拉伸适配 + 单线融合），用于对比"""
+    frames_b = node._batch_resize(frames_b, (frames_a.shape[1], frames_a.shape[2]))
+    mask = node._create_fusion_mask(frames_a.shape[1:3], "单线融合", 30, 0.5, 6)
+    if blur > 0:
+        mask = node._blur_mask(mask, blur)
+    mask = mask[None, ..., None]
+    mask = np.repeat(mask, 3, axis=3)
+    mask = np.repeat(mask, frames_a.shape[0], axis=0)
+    return frames_a * mask + frames_b * (1 - mask)
+
+
+def run_variant(variant, frames, height, width):
+    import torch
+    from node.advanced_fusion import DDAdvancedFusion
+
+    frames_a = torch.rand(frames, height, width, 3)
+    frames_b = torch.rand(frames, height, width, 3)
+    node = DDAdvancedFusion()
+    if variant != "torch":
+        frames_a, frames_b = frames_a.numpy(), frames_b.numpy()
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == "legacy":
+        result = legacy_fusion(node, frames_a, frames_b, 5)
+    else:
+        result = node.fusion_process(frames_a, frames_b, "单线融合", 30, 0.5, 5, 6, "拉伸", "较短")[0]
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+
+    output_mb = result.size * result.itemsize / 2**20 if isinstance(result, np.ndarray) \
+        else result.numel() * result.element_size() / 2**20
+    print(f"{variant}\t{peak / 1024:.0f}\t{output_mb:.0f}\t{elapsed:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=48)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--variant", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.frames, args.height, args.width)
+        return
+
+    print(f"{args.frames}帧 {args.width}x{args.height} 拉伸融合，峰值内存为相对输入准备完成后的增量")
+    print(f"{'实现':8s} {'峰值增量MB':>10s} {'输出MB':>8s} {'耗时s':>7s}  说明")
+    for variant, description in VARIANTS.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--variant", variant,
+             "--frames", str(args.frames), "--width", str(args.width), "--height", str(args.height)],
+            capture_output=True, text=True, check=True).stdout
+        name, peak, output_mb, elapsed = output.strip().splitlines()[-1].split("\t")
+        print(f"{name:8s} {peak:>10s} {output_mb:>8s} {elapsed:>7s}  {description}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+缩放引擎 质量与耗时基准
+
+对resize_utils.resize_bchw的每种缩放方法：
+1. 放大：与cv2.resize逐像素比较
+2. area缩小：整数倍与非整数倍与cv2.INTER_AREA比较
+3. 4K缩小到960x540的波带片（zone plate）：高于新奈奎斯特频率的区域理想结果为0.5灰，
+   统计其均方根偏差（混叠能量，越低越好），并与改动前的torch插值（无抗锯齿，lanczos退化为bilinear）和cv2对比
+4. 单帧3通道4K缩小耗时
+5. 8帧3通道4K批量缩小耗时，以及缩放引擎中间缓冲的估算值（area和lanczos在引擎内按平面分块，不随帧数增长）
+
+用法: python benchmarks/bench_resize.py
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from node.resize_utils import RESIZE_METHODS, SEPARABLE_CHUNK_BYTES, resize_bchw, resize_workspace_bytes
+
+CV2_METHODS = {
+    "nearest-exact": cv2.INTER_NEAREST_EXACT,
+    "bilinear": cv2.INTER_LINEAR,
+    "bicubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+# 改动前各选项实际使用的torch插值模式
+LEGACY_TORCH_MODES = {
+    "nearest-exact": "nearest",
+    "bilinear": "bilinear",
+    "bicubic": "bicubic",
+    "area": "area",
+    "lanczos": "bilinear",
+}
+
+
+def to_bchw(image):
+    return torch.from_numpy(image).permute(2, 0, 1)[None].contiguous()
+
+
+def to_hwc(tensor):
+    return tensor[0].permute(1, 2, 0).numpy()
+
+
+def legacy_resize(x, size, method):
+    mode = LEGACY_TORCH_MODES[method]
+    options = {} if mode in ("nearest", "area") else {"align_corners": False}
+    return F.interpolate(x, size=size, mode=mode, **options)
+
+
+def timed(fn, *args, repeat=3):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def upscale_parity(rng):
+    small = cv2.GaussianBlur(rng.random((135, 240, 3)).astype(np.float32), (0, 0), 1.5)
+    print("放大 240x135 -> 960x540，与cv2的最大绝对误差")
+    for method in RESIZE_METHODS:
+        ours = to_hwc(resize_bchw(to_bchw(small), (540, 960), method))
+        ref = cv2.resize(small, (960, 540), interpolation=CV2_METHODS[method])
+        if method in ("bicubic", "lanczos"):
+            ref = np.clip(ref, 0, 1)
+        print(f"  {method:14s} {np.abs(ours - ref).max():.4f}")
+    return small
+
+
+def area_parity(small):
+    large = small.repeat(4, 0).repeat(4, 1)
+    print("area缩小 960x540，与cv2.INTER_AREA的最大绝对误差")
+    for height, width in ((270, 480), (200, 333)):
+        ours = to_hwc(resize_bchw(to_bchw(large), (height, width), "area"))
+        ref = cv2.resize(large, (width, height), interpolation=cv2.INTER_AREA)
+        print(f"  -> {width}x{height} {np.abs(ours - ref).max():.5f}")
+
+
+def zone_plate():
+    height, width = 2160, 3840
+    out_h, out_w = 540, 960
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    plate = (0.5 + 0.5 * np.cos(np.pi * ((xx - width / 2) ** 2 + (yy - height / 2) ** 2) / width)).astype(np.float32)
+
+    # 局部频率为 r/W 周期/像素，输出奈奎斯特频率在输入上为0.125，取r > 0.18W留出过渡带
+    oy, ox = np.mgrid[0:out_h, 0:out_w]
+    radius = np.sqrt(((ox + 0.5) * 4 - width / 2) ** 2 + ((oy + 0.5) * 4 - height / 2) ** 2)
+    region = (radius > 0.18 * width) & (radius < 0.45 * height)
+
+    def alias_rms(image):
+        return np.sqrt(((image[region] - 0.5) ** 2).mean())
+
+    plate_rgb = np.ascontiguousarray(np.repeat(plate[..., None], 3, axis=2))
+    x = to_bchw(plate_rgb)
+    print("波带片 3840x2160 -> 960x540：混叠均方根（越低越好） / 3通道单帧耗时")
+    print(f"  {'方法':14s} {'本引擎':>16s} {'改动前torch':>16s} {'cv2':>16s}")
+    for method in RESIZE_METHODS:
+        ours, ours_time = timed(resize_bchw, x, (out_h, out_w), method)
+        legacy, legacy_time = timed(legacy_resize, x, (out_h, out_w), method)
+        ref, ref_time = timed(lambda image: cv2.resize(image, (out_w, out_h), interpolation=CV2_METHODS[method]), plate_rgb)
+        print(f"  {method:14s} {alias_rms(to_hwc(ours)[..., 0]):.4f} {ours_time * 1000:6.0f}ms "
+              f"{alias_rms(to_hwc(legacy)[..., 0]):.4f} {legacy_time * 1000:6.0f}ms "
+              f"{alias_rms(ref[..., 0]):.4f} {ref_time * 1000:6.0f}ms")
+
+
+def batch_downscale(frames=8):
+    height, width = 2160, 3840
+    out_h, out_w = 1000, 1777
+    x = torch.rand(frames, 3, height, width)
+    images = [np.ascontiguousarray(frame.permute(1, 2, 0).numpy()) for frame in x]
+    print(f"批量缩放 {frames}x3x{width}x{height} -> {out_w}x{out_h}：耗时 / 中间缓冲估算")
+    print(f"  {'方法':14s} {'本引擎':>8s} {'改动前torch':>10s} {'cv2逐帧':>8s} {'中间缓冲':>10s}")
+    for method in ("bilinear", "area", "lanczos"):
+        _, ours_time = timed(resize_bchw, x, (out_h, out_w), method, repeat=1)
+        _, legacy_time = timed(legacy_resize, x, (out_h, out_w), method, repeat=1)
+        _, ref_time = timed(lambda: [cv2.resize(image, (out_w, out_h), interpolation=CV2_METHODS[method])
+                                     for image in images], repeat=1)
+        workspace = resize_workspace_bytes((height, width), (out_h, out_w), method, 3)
+        print(f"  {method:14s} {ours_time:7.2f}s {legacy_time:9.2f}s {ref_time:7.2f}s "
+              f"{workspace / 1024**2:8.0f}MB")
+    print(f"  area/lanczos每块中间缓冲上限 {SEPARABLE_CHUNK_BYTES // 1024**2}MB")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    small = upscale_parity(rng)
+    area_parity(small)
+    zone_plate()
+    batch_downscale()
+
+
+if __name__ == "__main__":
+    main()
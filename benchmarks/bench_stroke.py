@@ -0,0 +1,100 @@
+"""
+DD 图片描边 描边遮罩耗时基准
+
+1. 比较形态学（椭圆膨胀/腐蚀）与距离场两种描边算法的遮罩计算耗时随描边大小的变化，
+   并给出两者描边覆盖面积的差异。距离场的耗时应与描边大小无关。
+2. 透明图整个节点的耗时：改动前的逐帧cv2/PIL处理、批量张量引擎（遮罩加合成）、
+   以及节点实际选择的路径（CPU上为逐帧处理，GPU上为批量张量引擎）。有CUDA时同时测试GPU。
+
+用法: python benchmarks/bench_stroke.py [--frames 20] [--size 512] [--position 外描边]
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from node.image_stroke import DDImageStroke
+
+STROKE_SIZES = (1, 10, 50, 100, 200)
+
+
+def make_alpha(frames, size):
+    """生成带不规则透明边缘的测试alpha：每帧一个位置不同的圆形和矩形"""
+    yy, xx = torch.meshgrid(torch.arange(size), torch.arange(size), indexing="ij")
+    alpha = torch.zeros(frames, size, size)
+    for i in range(frames):
+        cx, cy = size * (0.35 + 0.01 * i), size * 0.45
+        circle = (xx - cx) ** 2 + (yy - cy) ** 2 < (size * 0.18) ** 2
+        box = (abs(xx - size * 0.62) < size * 0.1) & (abs(yy - size * 0.6) < size * 0.15)
+        alpha[i] = (circle | box).float()
+    return alpha
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+
+
+def tensor_engine(node, image, stroke_size, position, stroke_color):
+    """不经过设备分派，直接运行批量张量引擎的遮罩计算和合成"""
+    alpha = image[..., 3]
+    stroke_mask = node.create_stroke_mask_tensor(alpha, stroke_size, position)
+    return node.composite_stroke_tensor(image[..., :3], alpha, stroke_mask, stroke_color, position)
+
+
+def node_comparison(node, alpha, position, device):
+    image = torch.cat([torch.rand(alpha.shape + (3,)), alpha.unsqueeze(-1)], dim=-1)
+    stroke_color = node.parse_stroke_color("#FF0000", 100)
+    gpu_image = image.to(device)
+
+    def run(fn, *args):
+        synchronize(device)
+        start = time.perf_counter()
+        fn(*args)
+        synchronize(device)
+        return time.perf_counter() - start
+
+    print(f"透明图整个节点耗时（{device.type}），改动前为逐帧cv2/PIL处理")
+    print(f"{'大小':>6s} {'改动前s':>9s} {'张量引擎s':>10s} {'节点s':>9s}")
+    for stroke_size in STROKE_SIZES[:3]:
+        baseline = run(node.add_stroke_per_frame, image, False, position, stroke_size, 100, "#FF0000")
+        engine = run(tensor_engine, node, gpu_image, stroke_size, position, stroke_color)
+        actual = run(node.add_stroke, gpu_image, False, position, stroke_size, 100, "#FF0000")
+        print(f"{stroke_size:>6d} {baseline:>9.2f} {engine:>10.2f} {actual:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--position", choices=["外描边", "内描边", "居中描边"], default="外描边")
+    args = parser.parse_args()
+
+    node = DDImageStroke()
+    alpha = make_alpha(args.frames, args.size)
+
+    print(f"{args.frames}帧 {args.size}x{args.size} {args.position}，描边遮罩计算耗时")
+    print(f"{'大小':>6s} {'形态学s':>9s} {'距离场s':>9s} {'覆盖面积差':>10s}")
+    for stroke_size in STROKE_SIZES:
+        morph, morph_time = timed(node.create_stroke_mask_tensor, alpha, stroke_size, args.position)
+        dist, dist_time = timed(node.create_stroke_mask_distance_tensor, alpha, stroke_size, args.position)
+        coverage = (dist.sum() - morph.sum()).abs() / morph.sum().clamp(min=1)
+        print(f"{stroke_size:>6d} {morph_time:>9.2f} {dist_time:>9.2f} {coverage.item():>10.2%}")
+
+    node_comparison(node, alpha, args.position, torch.device("cpu"))
+    if torch.cuda.is_available():
+        node_comparison(node, alpha, args.position, torch.device("cuda"))
+
+
+if __name__ == "__main__":
+    main()
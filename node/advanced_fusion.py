@@ -1,7 +1,73 @@
+import math
+from collections import OrderedDict
+
 import torch
 import numpy as np
 import cv2
 
+from .frame_utils import RESAMPLE_MODE_MAP, resample_frames
+
+
+class FusionMaskCache:
+    """
+    融合掩码LRU缓存
+    按尺寸和几何参数缓存已完成边缘模糊的掩码，超出内存上限时淘汰最久未使用的条目
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def _nbytes(mask):
+        if isinstance(mask, torch.Tensor):
+            return mask.numel() * mask.element_size()
+        return mask.nbytes
+
+    def get(self, key):
+        mask = self._entries.get(key)
+        if mask is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return mask
+
+    def put(self, key, mask):
+        size = self._nbytes(mask)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._nbytes(self._entries.pop(key))
+        self._entries[key] = mask
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._nbytes(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+# 进程内共享的融合掩码缓存
+MASK_CACHE = FusionMaskCache(max_bytes=256 * 1024**2)
+
+# torch路径中允许回退到NumPy路径的异常：显存不足，或当前设备不支持某个算子
+TORCH_FALLBACK_ERRORS = (getattr(torch, "OutOfMemoryError", torch.cuda.OutOfMemoryError),
+                         NotImplementedError)
+
 class DDAdvancedFusion:
     @classmethod
     def INPUT_TYPES(cls):
@@ -40,6 +106,7 @@ class DDAdvancedFusion:
                 }),
                 "尺寸适配": (["自适应", "拉伸", "裁剪", "填充"],),
                 "帧数适配": (["较短", "较长", "平均"],),
+                "帧插值": (["线性", "最近", "保持"], {"default": "线性"}),
             }
         }
 
@@ -48,9 +115,25 @@ class DDAdvancedFusion:
     RETURN_NAMES = ("融合结果",)
     FUNCTION = "fusion_process"
 
+    # 融合阶段每次处理的帧数
+    BLEND_CHUNK_FRAMES = 16
+    # 边缘模糊半径超过该值时先降采样再模糊
+    BLUR_DOWNSAMPLE_RADIUS = 24
+
     def fusion_process(self, 输入A, 输入B, 融合类型="单线融合",  # 改名：分割->融合
                       融合角度=0, 融合比例=0.5, 边缘模糊=0,  # 改名：分割->融合
-                      多边形边数=6, 尺寸适配="自适应", 帧数适配="较短"):
+                      多边形边数=6, 尺寸适配="自适应", 帧数适配="较短", 帧插值="线性"):
+        resample_mode = RESAMPLE_MODE_MAP.get(帧插值, "linear")
+
+        # 张量输入优先走torch路径，全程保持原设备和数据类型
+        if isinstance(输入A, torch.Tensor) and isinstance(输入B, torch.Tensor):
+            try:
+                return self._fusion_process_torch(输入A, 输入B, 融合类型, 融合角度, 融合比例,
+                                                  边缘模糊, 多边形边数, 尺寸适配, 帧数适配,
+                                                  resample_mode)
+            except TORCH_FALLBACK_ERRORS as e:
+                print(f"[高级融合] torch路径处理失败，回退到NumPy路径: {str(e)}")
+
         # 转换为numpy数组
         if isinstance(输入A, torch.Tensor):
             输入A = 输入A.cpu().numpy()
@@ -77,9 +160,9 @@ class DDAdvancedFusion:
 
         # 调整帧数
         if frames_A != target_frames:
-            输入A = self._adjust_frames(输入A, target_frames)
+            输入A = self._adjust_frames(输入A, target_frames, resample_mode)
         if frames_B != target_frames:
-            输入B = self._adjust_frames(输入B, target_frames)
+            输入B = self._adjust_frames(输入B, target_frames, resample_mode)
 
         # 处理尺寸
         if 尺寸适配 == "拉伸":
@@ -91,50 +174,236 @@ class DDAdvancedFusion:
         else:  # 填充
             输入B = self._batch_pad(输入B, (输入A.shape[1], 输入A.shape[2]))
 
-        # 创建融合掩码  # 改名：分割->融合
-        mask = self._create_fusion_mask(输入A.shape[1:3], 融合类型, 融合角度, 
-                                    融合比例, 多边形边数)
-
-        # 应用边缘模糊
-        if 边缘模糊 > 0:
-            mask = cv2.GaussianBlur(mask, (边缘模糊*2+1, 边缘模糊*2+1), 0)
+        # 创建融合掩码并应用边缘模糊（参数不变时复用缓存）  # 改名：分割->融合
+        mask = self._get_fusion_mask(输入A.shape[1:3], 融合类型, 融合角度,
+                                     融合比例, 多边形边数, 边缘模糊)
 
-        # 扩展掩码维度
-        mask = mask[None, ..., None]  # 添加批次和通道维度
-        mask = np.repeat(mask, 3, axis=3)  # 复制到三个通道
-        mask = np.repeat(mask, target_frames, axis=0)  # 扩展到目标帧数
-
-        # 融合图像
-        result = 输入A * mask + 输入B * (1 - mask)
+        # 融合图像：掩码形状为(1,H,W,1)，按帧块广播融合
+        result = self._blend_frames(输入A, 输入B, mask)
         
         return (torch.from_numpy(result),)
 
-    def _adjust_frames(self, video, target_frames):
-        """调整视频帧数"""
-        if video.shape[0] == target_frames:
-            return video
-        
-        # 计算帧索引
-        orig_indices = np.arange(video.shape[0])
-        target_indices = np.linspace(0, video.shape[0] - 1, target_frames)
-        
-        # 创建结果数组
-        result = np.zeros((target_frames, *video.shape[1:]), dtype=video.dtype)
-        
-        # 对每个目标帧进行插值
-        for i, target_idx in enumerate(target_indices):
-            if target_idx.is_integer():
-                result[i] = video[int(target_idx)]
-            else:
-                # 线性插值
-                idx_floor = int(np.floor(target_idx))
-                idx_ceil = int(np.ceil(target_idx))
-                weight_ceil = target_idx - idx_floor
-                weight_floor = 1 - weight_ceil
-                result[i] = video[idx_floor] * weight_floor + video[idx_ceil] * weight_ceil
-                
+    def _fusion_process_torch(self, 输入A, 输入B, 融合类型, 融合角度, 融合比例,
+                              边缘模糊, 多边形边数, 尺寸适配, 帧数适配, resample_mode="linear"):
+        """torch原生融合流程，输入A决定输出的设备和数据类型"""
+        device = 输入A.device
+        dtype = 输入A.dtype if 输入A.is_floating_point() else torch.float32
+
+        # 保证输入为4D
+        if 输入A.dim() == 3:
+            输入A = 输入A.unsqueeze(0)
+        if 输入B.dim() == 3:
+            输入B = 输入B.unsqueeze(0)
+        输入A = 输入A.to(dtype=dtype)
+        输入B = 输入B.to(device=device, dtype=dtype)
+
+        # 确定目标帧数
+        frames_A = 输入A.shape[0]
+        frames_B = 输入B.shape[0]
+        if 帧数适配 == "较短":
+            target_frames = min(frames_A, frames_B)
+        elif 帧数适配 == "较长":
+            target_frames = max(frames_A, frames_B)
+        else:  # "平均"
+            target_frames = (frames_A + frames_B) // 2
+
+        # 调整帧数
+        if frames_A != target_frames:
+            输入A = self._adjust_frames(输入A, target_frames, resample_mode)
+        if frames_B != target_frames:
+            输入B = self._adjust_frames(输入B, target_frames, resample_mode)
+
+        # 处理尺寸
+        target_size = (输入A.shape[1], 输入A.shape[2])
+        if 尺寸适配 == "拉伸":
+            输入B = self._batch_resize_torch(输入B, target_size)
+        elif 尺寸适配 == "裁剪":
+            输入B = self._batch_center_crop(输入B, target_size)
+        else:  # 自适应 / 填充
+            输入B = self._batch_adaptive_resize_torch(输入B, target_size)
+
+        # 创建融合掩码并应用边缘模糊（参数不变时复用缓存）
+        mask = self._get_fusion_mask(target_size, 融合类型, 融合角度,
+                                     融合比例, 多边形边数, 边缘模糊, device)
+
+        # 融合图像：掩码形状为(1,H,W,1)，按帧块广播融合
+        result = self._blend_frames(输入A, 输入B, mask.to(dtype))
+
+        return (result,)
+
+    def _blend_frames(self, frames_a, frames_b, mask):
+        """按帧块将A、B两组帧合成到预分配的输出中
+
+        掩码只保留一份(1,H,W,1)并广播到所有帧和通道，
+        输出缓冲区与输入A同类型，峰值内存约等于输出大小
+        """
+        chunk = self.BLEND_CHUNK_FRAMES
+        total = frames_a.shape[0]
+
+        if isinstance(frames_a, torch.Tensor):
+            mask = mask[None, ..., None]
+            result = torch.empty_like(frames_a)
+            for start in range(0, total, chunk):
+                end = min(start + chunk, total)
+                # 结果 = B + (A - B) * mask
+                torch.lerp(frames_b[start:end], frames_a[start:end], mask, out=result[start:end])
+            return result
+
+        mask = mask.astype(frames_a.dtype, copy=False)[None, ..., None]
+        result = np.empty(frames_a.shape, dtype=frames_a.dtype)
+        for start in range(0, total, chunk):
+            end = min(start + chunk, total)
+            out = result[start:end]
+            np.subtract(frames_a[start:end], frames_b[start:end], out=out, casting='unsafe')
+            out *= mask
+            out += frames_b[start:end]
         return result
 
+    def _interpolate_bhwc(self, batch, size):
+        """对BHWC张量做双线性缩放，与cv2.resize默认的INTER_LINEAR对齐"""
+        resized = torch.nn.functional.interpolate(
+            batch.permute(0, 3, 1, 2),
+            size=size,
+            mode='bilinear',
+            align_corners=False
+        )
+        return resized.permute(0, 2, 3, 1)
+
+    def _batch_resize_torch(self, batch, target_size):
+        """批量调整尺寸（torch版本）"""
+        if tuple(batch.shape[1:3]) == tuple(target_size):
+            return batch
+        return self._interpolate_bhwc(batch, target_size)
+
+    def _batch_adaptive_resize_torch(self, batch, target_size):
+        """批量自适应调整尺寸（torch版本），同时用于填充模式"""
+        h, w = batch.shape[1:3]
+        ratio = min(target_size[1]/w, target_size[0]/h)
+        new_w = int(w * ratio)
+        new_h = int(h * ratio)
+
+        if (new_h, new_w) != (h, w):
+            batch = self._interpolate_bhwc(batch, (new_h, new_w))
+
+        resized = batch.new_zeros((batch.shape[0], target_size[0], target_size[1], batch.shape[3]))
+        y_offset = (target_size[0] - new_h) // 2
+        x_offset = (target_size[1] - new_w) // 2
+        resized[:, y_offset:y_offset+new_h, x_offset:x_offset+new_w] = batch
+
+        return resized
+
+    def _create_fusion_mask_torch(self, shape, mode, angle, ratio, polygon_sides, device):
+        """创建融合掩码（torch版本）
+
+        掩码只在缓存未命中时生成一次，直接复用NumPy/cv2版本的结果再移动到目标设备，
+        保证角度掩码的边界（float64计算）和多边形的边缘规则（cv2.fillPoly）与NumPy路径完全一致
+        """
+        mask = self._create_fusion_mask(shape, mode, angle, ratio, polygon_sides)
+        return torch.from_numpy(mask).to(device)
+
+    def _get_fusion_mask(self, shape, mode, angle, ratio, polygon_sides, blur, device=None):
+        """获取已完成边缘模糊的融合掩码
+
+        device为None时返回numpy数组，否则返回该设备上的张量。
+        掩码按(尺寸, 融合类型, 角度, 比例, 边数, 模糊)缓存，参数不变时跳过掩码合成
+        """
+        height, width = shape
+        if mode == "单线融合":
+            polygon_sides = None  # 单线融合与边数无关
+        backend = "numpy" if device is None else str(device)
+        key = (backend, height, width, mode, angle, ratio, polygon_sides, blur)
+
+        mask = MASK_CACHE.get(key)
+        if mask is None:
+            if device is None:
+                mask = self._create_fusion_mask((height, width), mode, angle, ratio, polygon_sides)
+                if blur > 0:
+                    mask = self._blur_mask(mask, blur)
+            else:
+                mask = self._create_fusion_mask_torch((height, width), mode, angle, ratio,
+                                                      polygon_sides, device)
+                if blur > 0:
+                    mask = self._blur_mask_torch(mask, blur)
+            MASK_CACHE.put(key, mask)
+        return mask
+
+    def _blur_plan(self, blur):
+        """计算大半径模糊的降采样倍数、边界填充和等效sigma
+
+        sigma与cv2.GaussianBlur在sigma=0时由核大小推导的值一致，
+        降采样后扣除区域平均本身带来的模糊，使结果与全分辨率模糊基本一致
+        """
+        sigma = 0.3 * (blur - 1) + 0.8
+        factor = max(2, blur // 8)
+        pad = -(-blur // factor) * factor
+        small_sigma = math.sqrt(max(sigma ** 2 - factor ** 2 / 12, 0.25)) / factor
+        small_radius = max(1, math.ceil(3 * small_sigma))
+        return factor, pad, small_radius, small_sigma
+
+    def _blur_mask(self, mask, blur):
+        """对掩码应用边缘模糊
+
+        半径超过BLUR_DOWNSAMPLE_RADIUS时先降采样、模糊后再升采样，
+        计算量不再随模糊半径增长
+        """
+        height, width = mask.shape
+        if blur <= self.BLUR_DOWNSAMPLE_RADIUS:
+            return cv2.GaussianBlur(mask, (blur*2+1, blur*2+1), 0)
+
+        factor, pad, radius, sigma = self._blur_plan(blur)
+        pad_bottom = pad + (-(height + 2 * pad)) % factor
+        pad_right = pad + (-(width + 2 * pad)) % factor
+        padded = cv2.copyMakeBorder(mask, pad, pad_bottom, pad, pad_right, cv2.BORDER_REFLECT_101)
+
+        full_size = (padded.shape[1], padded.shape[0])
+        small = cv2.resize(padded, (full_size[0] // factor, full_size[1] // factor),
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (radius*2+1, radius*2+1), sigma)
+        blurred = cv2.resize(small, full_size, interpolation=cv2.INTER_LINEAR)
+
+        return np.ascontiguousarray(blurred[pad:pad+height, pad:pad+width])
+
+    def _blur_mask_torch(self, mask, blur):
+        """对掩码应用边缘模糊（torch版本），大半径同样走降采样路径"""
+        height, width = mask.shape
+        factor, pad, radius, sigma = self._blur_plan(blur)
+        if blur <= self.BLUR_DOWNSAMPLE_RADIUS or pad >= min(height, width):
+            # sigma为0时由cv2按核大小推导，核大小不超过7时使用cv2的固定核
+            return self._gaussian_blur_torch(mask, blur, 0)
+
+        pad_bottom = pad + (-(height + 2 * pad)) % factor
+        pad_right = pad + (-(width + 2 * pad)) % factor
+        x = torch.nn.functional.pad(mask[None, None], (pad, pad_right, pad, pad_bottom), mode='reflect')
+
+        small = torch.nn.functional.avg_pool2d(x, factor)
+        small = self._gaussian_blur_torch(small[0, 0], radius, sigma)
+        blurred = torch.nn.functional.interpolate(
+            small[None, None],
+            size=x.shape[2:],
+            mode='bilinear',
+            align_corners=False
+        )
+
+        return blurred[0, 0, pad:pad+height, pad:pad+width].contiguous()
+
+    def _gaussian_blur_torch(self, mask, radius, sigma):
+        """可分离高斯模糊（torch版本），核系数和边界处理与cv2.GaussianBlur一致"""
+        kernel = cv2.getGaussianKernel(radius * 2 + 1, sigma)
+        kernel = torch.from_numpy(kernel).to(mask.device, torch.float32).flatten()
+
+        # cv2默认边界为BORDER_REFLECT_101，对应torch的reflect填充
+        x = mask[None, None]
+        x = torch.nn.functional.pad(x, (radius, radius, 0, 0), mode='reflect')
+        x = torch.nn.functional.conv2d(x, kernel.view(1, 1, 1, -1))
+        x = torch.nn.functional.pad(x, (0, 0, radius, radius), mode='reflect')
+        x = torch.nn.functional.conv2d(x, kernel.view(1, 1, -1, 1))
+
+        return x[0, 0]
+
+    def _adjust_frames(self, video, target_frames, mode="linear"):
+        """调整视频帧数"""
+        return resample_frames(video, target_frames, mode)
+
     def _batch_resize(self, batch, target_size):
         """批量调整尺寸"""
         resized = np.zeros((batch.shape[0], target_size[0], target_size[1], batch.shape[3]), dtype=batch.dtype)
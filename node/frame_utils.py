@@ -0,0 +1,92 @@
+import torch
+import numpy as np
+
+# 帧重采样模式
+RESAMPLE_MODES = ("linear", "nearest", "hold")
+
+# 节点界面选项与重采样模式的对应关系
+RESAMPLE_MODE_MAP = {
+    "线性": "linear",
+    "最近": "nearest",
+    "保持": "hold",
+}
+
+# 线性插值时每次处理的帧数，块内批量计算，避免生成整段视频大小的临时数组
+RESAMPLE_CHUNK_FRAMES = 8
+
+
+def _resample_plan(source_frames, target_frames, mode):
+    """计算每个目标帧对应的前后源帧索引和插值权重"""
+    if mode == "hold":
+        # 保持原始时间轴：多余的帧截断，不足的帧重复最后一帧
+        idx = np.minimum(np.arange(target_frames), source_frames - 1)
+        return idx, idx, None
+
+    positions = np.linspace(0, source_frames - 1, target_frames)
+    if mode == "nearest":
+        idx = np.floor(positions + 0.5).astype(np.int64)
+        return idx, idx, None
+
+    idx_floor = np.floor(positions).astype(np.int64)
+    idx_ceil = np.ceil(positions).astype(np.int64)
+    weights = positions - idx_floor
+    if not weights.any():
+        return idx_floor, idx_floor, None
+    return idx_floor, idx_ceil, weights
+
+
+def resample_frames(video, target_frames, mode="linear"):
+    """
+    将帧序列重采样到指定帧数，支持torch.Tensor和numpy数组
+
+    Args:
+        video: 帧序列，第0维为帧，形状如(B,H,W,C)或(B,H,W)
+        target_frames: 目标帧数
+        mode: "linear"（前后帧线性插值）、"nearest"（取最近帧）
+              或 "hold"（按原时间轴截断或重复末帧）
+
+    Returns:
+        重采样后的帧序列，类型、设备和数据类型与输入一致
+    """
+    if mode not in RESAMPLE_MODES:
+        raise ValueError(f"不支持的帧重采样模式: {mode}")
+
+    source_frames = video.shape[0]
+    if source_frames == target_frames:
+        return video
+    if source_frames == 0:
+        raise ValueError("输入帧序列为空")
+
+    idx_floor, idx_ceil, weights = _resample_plan(source_frames, target_frames, mode)
+    weight_shape = (-1,) + (1,) * (video.ndim - 1)
+    chunk = RESAMPLE_CHUNK_FRAMES
+
+    if isinstance(video, torch.Tensor):
+        idx_floor = torch.from_numpy(idx_floor).to(video.device)
+        if weights is None:
+            return video.index_select(0, idx_floor)
+
+        idx_ceil = torch.from_numpy(idx_ceil).to(video.device)
+        weights = torch.from_numpy(weights).to(video.device, video.dtype).view(weight_shape)
+        result = video.new_empty((target_frames,) + tuple(video.shape[1:]))
+        for start in range(0, target_frames, chunk):
+            end = min(start + chunk, target_frames)
+            out = result[start:end]
+            torch.index_select(video, 0, idx_floor[start:end], out=out)
+            out.lerp_(video.index_select(0, idx_ceil[start:end]), weights[start:end])
+        return result
+
+    if weights is None:
+        return video[idx_floor]
+
+    weights = weights.astype(video.dtype).reshape(weight_shape)
+    result = np.empty((target_frames,) + video.shape[1:], dtype=video.dtype)
+    for start in range(0, target_frames, chunk):
+        end = min(start + chunk, target_frames)
+        out = result[start:end]
+        np.take(video, idx_floor[start:end], axis=0, out=out)
+        delta = video[idx_ceil[start:end]]
+        delta -= out
+        delta *= weights[start:end]
+        out += delta
+    return result
@@ -2,6 +2,7 @@ import torch
 import numpy as np
 import cv2
 import comfy.utils
+from .resize_utils import resize_bchw, resize_workspace_bytes
 from typing import List, Dict, Any, Tuple
 
 class DDImageUniformSize:
@@ -20,6 +21,9 @@ class DDImageUniformSize:
                 "宽度": ("INT", {"default": 512, "min": 8, "max": 8192, "step": 8}),
                 "高度": ("INT", {"default": 512, "min": 8, "max": 8192, "step": 8}),
                 "尺寸适配": (["自适应", "拉伸", "裁剪", "填充"], {"default": "自适应"}),
+                "分块帧数": ("INT", {"default": 0, "min": 0, "max": 4096, "step": 1}),
+                "填充方式": (["纯色", "边缘复制", "镜像"], {"default": "纯色"}),
+                "填充颜色": ("COLOR", {"default": "#000000"}),
             },
             "optional": {
                 # 四个固定的可选输入端口
@@ -46,8 +50,12 @@ class DDImageUniformSize:
         "lanczos": cv2.INTER_LANCZOS4
     }
 
-    def _resize_batch(self, image_batch, target_size, interpolation_mode, size_adapt):
-        """调整一批图像的大小"""
+    # 分块帧数为0时，每块的输入、中间结果和画布总内存上限
+    CHUNK_MEMORY_BYTES = 256 * 1024**2
+
+    def _resize_batch(self, image_batch, target_size, interpolation_mode, size_adapt, out=None,
+                      pad_mode="纯色", fill_color="#000000"):
+        """调整一批图像的大小，结果写入out（连续的BHWC张量），未提供时新建"""
         if image_batch is None:
             return None
             
@@ -59,77 +67,66 @@ class DDImageUniformSize:
         if len(image_batch.shape) == 3:  # 单张图片 [H, W, C]
             image_batch = image_batch.unsqueeze(0)  # [1, H, W, C]
         
-        batch_size, height, width, channels = image_batch.shape
-        target_height, target_width = target_size
-        result = None
-        
         # 获取插值方法
         interpolation = self.INTERPOLATION_MAP.get(interpolation_mode, cv2.INTER_LINEAR)
         
         # 根据尺寸适配方法调整图像
         if size_adapt == "拉伸":
             # 直接调整到目标尺寸
-            result = self._batch_resize(image_batch, target_size, interpolation)
+            return self._batch_resize(image_batch, target_size, interpolation, out)
         
         elif size_adapt == "自适应":
             # 保持宽高比缩放
-            result = self._batch_adaptive_resize(image_batch, target_size, interpolation)
+            return self._batch_adaptive_resize(image_batch, target_size, interpolation, out)
             
         elif size_adapt == "裁剪":
             # 保持宽高比缩放后居中裁剪
-            result = self._batch_center_crop(image_batch, target_size, interpolation)
+            return self._batch_center_crop(image_batch, target_size, interpolation, out)
             
         elif size_adapt == "填充":
-            # 保持宽高比缩放后填充
-            result = self._batch_pad(image_batch, target_size, interpolation)
+            # 保持宽高比缩放后按填充方式补齐
+            return self._batch_pad(image_batch, target_size, interpolation, out, pad_mode, fill_color)
             
-        else:
-            # 默认使用自适应
-            result = self._batch_adaptive_resize(image_batch, target_size, interpolation)
-        
-        return result
+        # 默认使用自适应
+        return self._batch_adaptive_resize(image_batch, target_size, interpolation, out)
 
-    def _batch_resize(self, batch, target_size, interpolation):
-        """批量调整尺寸 - 直接拉伸"""
-        # 使用PyTorch内置的resize函数
+    def _new_output(self, batch, target_size, out):
+        """返回目标尺寸的连续BHWC输出张量"""
+        if out is not None:
+            return out
         target_height, target_width = target_size
+        return torch.empty((batch.shape[0], target_height, target_width, batch.shape[3]),
+                           dtype=batch.dtype, device=batch.device)
+
+    def _interpolate(self, batch, size, interpolation):
+        """将BHWC批次缩放到size=(H, W)，返回BCHW结果"""
         # 将图像从BHWC转换为BCHW
-        batch_bchw = batch.permute(0, 3, 1, 2) 
-        
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(target_height, target_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(target_height, target_width),
-                mode=torch_mode
-            )
-        
-        # 转回BHWC
-        return resized.permute(0, 2, 3, 1)
+        return resize_bchw(batch.permute(0, 3, 1, 2), size, self._get_resize_method(interpolation))
 
-    def _get_torch_mode(self, cv2_interpolation):
-        """将OpenCV插值模式转换为PyTorch模式"""
+    def _batch_resize(self, batch, target_size, interpolation, out=None):
+        """批量调整尺寸 - 直接拉伸"""
+        out = self._new_output(batch, target_size, out)
+        resized = self._interpolate(batch, tuple(target_size), interpolation)
+        # 转回BHWC并写入连续输出
+        out.copy_(resized.permute(0, 2, 3, 1))
+        return out
+
+    def _get_resize_method(self, cv2_interpolation):
+        """将OpenCV插值模式转换为缩放引擎的方法名"""
         if cv2_interpolation in [cv2.INTER_NEAREST, cv2.INTER_NEAREST_EXACT]:
-            return 'nearest'
+            return 'nearest-exact'
         elif cv2_interpolation == cv2.INTER_LINEAR:
             return 'bilinear'
         elif cv2_interpolation == cv2.INTER_CUBIC:
             return 'bicubic'
         elif cv2_interpolation == cv2.INTER_AREA:
             return 'area'
+        elif cv2_interpolation == cv2.INTER_LANCZOS4:
+            return 'lanczos'
         else:
             return 'bilinear'  # 默认返回双线性
 
-    def _batch_adaptive_resize(self, batch, target_size, interpolation):
+    def _batch_adaptive_resize(self, batch, target_size, interpolation, out=None):
         """批量自适应调整尺寸 - 保持宽高比"""
         batch_size, height, width, channels = batch.shape
         target_height, target_width = target_size
@@ -140,38 +137,22 @@ class DDImageUniformSize:
         new_height = int(height * ratio)
         
         # 先调整大小
-        batch_bchw = batch.permute(0, 3, 1, 2)
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(new_height, new_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(new_height, new_width),
-                mode=torch_mode
-            )
-        
-        # 创建目标大小的空张量
-        result = torch.zeros(batch_size, channels, target_height, target_width, device=batch.device)
+        resized = self._interpolate(batch, (new_height, new_width), interpolation)
         
         # 计算偏移量
         y_offset = (target_height - new_height) // 2
         x_offset = (target_width - new_width) // 2
         
-        # 将调整后的图像放在中心
-        result[:, :, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized
-        
-        # 转回BHWC
-        return result.permute(0, 2, 3, 1)
+        # 四周留白置零，调整后的图像放在中心
+        out = self._new_output(batch, target_size, out)
+        out[:, :y_offset].zero_()
+        out[:, y_offset + new_height:].zero_()
+        out[:, y_offset:y_offset + new_height, :x_offset].zero_()
+        out[:, y_offset:y_offset + new_height, x_offset + new_width:].zero_()
+        out[:, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized.permute(0, 2, 3, 1)
+        return out
 
-    def _batch_center_crop(self, batch, target_size, interpolation):
+    def _batch_center_crop(self, batch, target_size, interpolation, out=None):
         """批量中心裁剪 - 先调整大小然后裁剪"""
         batch_size, height, width, channels = batch.shape
         target_height, target_width = target_size
@@ -182,40 +163,120 @@ class DDImageUniformSize:
         new_height = int(height * ratio)
         
         # 调整大小
-        batch_bchw = batch.permute(0, 3, 1, 2)
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(new_height, new_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_bchw,
-                size=(new_height, new_width),
-                mode=torch_mode
-            )
+        resized = self._interpolate(batch, (new_height, new_width), interpolation)
         
         # 计算裁剪区域
         y_start = (new_height - target_height) // 2
         x_start = (new_width - target_width) // 2
         
-        # 裁剪中心区域
+        # 裁剪中心区域并转回BHWC
         cropped = resized[:, :, y_start:y_start + target_height, x_start:x_start + target_width]
+        out = self._new_output(batch, target_size, out)
+        out.copy_(cropped.permute(0, 2, 3, 1))
+        return out
+
+    def _batch_pad(self, batch, target_size, interpolation, out=None, pad_mode="纯色", fill_color="#000000"):
+        """批量填充 - 保持宽高比缩放到目标尺寸以内，四周按填充方式补齐"""
+        batch_size, height, width, channels = batch.shape
+        target_height, target_width = target_size
+        new_height, new_width = self._fit_size(height, width, target_size)
+        
+        # 原图已是适配尺寸时跳过插值，直接放置原图
+        if new_width == width and new_height == height:
+            content = batch
+        else:
+            content = self._interpolate(batch, (new_height, new_width), interpolation).permute(0, 2, 3, 1)
+        
+        # 计算偏移量
+        y_offset = (target_height - new_height) // 2
+        x_offset = (target_width - new_width) // 2
+        out = self._new_output(batch, target_size, out)
         
-        # 转回BHWC
-        return cropped.permute(0, 2, 3, 1)
+        if pad_mode == "纯色":
+            # 四周填充颜色，内容区域一次切片赋值
+            color = torch.tensor(self._parse_fill_color(fill_color, channels), dtype=out.dtype, device=out.device)
+            out[:, :y_offset] = color
+            out[:, y_offset + new_height:] = color
+            out[:, y_offset:y_offset + new_height, :x_offset] = color
+            out[:, y_offset:y_offset + new_height, x_offset + new_width:] = color
+            out[:, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = content
+        else:
+            # 边缘复制/镜像：按行列索引从内容中取样，一次生成整个画布
+            rows = self._pad_index(new_height, target_height, y_offset, pad_mode, out.device)
+            cols = self._pad_index(new_width, target_width, x_offset, pad_mode, out.device)
+            torch.index_select(content.index_select(1, rows), 2, cols, out=out)
+        return out
+
+    def _fit_size(self, height, width, target_size):
+        """保持宽高比放入目标尺寸的最大尺寸(H, W)"""
+        target_height, target_width = target_size
+        ratio = min(target_width / width, target_height / height)
+        return int(height * ratio), int(width * ratio)
+
+    def _pad_index(self, size, target, offset, pad_mode, device):
+        """计算目标画布每个位置在内容中的取样索引"""
+        positions = torch.arange(target, device=device) - offset
+        if pad_mode == "边缘复制" or size == 1:
+            return positions.clamp(0, size - 1)
+        # 镜像（不重复边缘像素，与cv2.BORDER_REFLECT_101一致）
+        period = 2 * (size - 1)
+        positions = positions.abs() % period
+        return torch.where(positions >= size, period - positions, positions)
 
-    def _batch_pad(self, batch, target_size, interpolation):
-        """批量填充 - 保持宽高比并填充"""
-        # 这与自适应调整相同，因为我们已经创建了全零背景并居中放置调整后的图像
-        return self._batch_adaptive_resize(batch, target_size, interpolation)
+    def _parse_fill_color(self, fill_color, channels):
+        """将十六进制颜色解析为0-1的各通道数值，多余的通道（如alpha）填0，与原先的全零画布一致"""
+        try:
+            hex_color = fill_color.lstrip('#')
+            if len(hex_color) == 3:
+                hex_color = ''.join(c * 2 for c in hex_color)
+            rgb = [int(hex_color[i:i + 2], 16) / 255.0 for i in (0, 2, 4)]
+        except (AttributeError, ValueError, IndexError):
+            rgb = [0.0, 0.0, 0.0]  # 解析失败时使用黑色
+        if channels < 3:
+            return [sum(rgb) / 3.0] * channels
+        return rgb + [0.0] * (channels - 3)
 
-    def resize_images(self, 缩放方法, 宽度, 高度, 尺寸适配, 图片A=None, 图片B=None, 图片C=None, 图片D=None):
+    def _chunk_frames(self, chunk_frames, frame_shape, target_size, interpolation_mode="双线性插值", size_adapt="拉伸"):
+        """每块处理的帧数，0表示按CHUNK_MEMORY_BYTES自动计算"""
+        if chunk_frames > 0:
+            return chunk_frames
+        height, width, channels = frame_shape
+        target_height, target_width = target_size
+        # 缩放步骤实际输出的尺寸：裁剪先放大到覆盖目标，自适应/填充缩小到目标以内
+        if size_adapt == "裁剪":
+            ratio = max(target_width / width, target_height / height)
+            resize_size = (max(1, int(height * ratio)), max(1, int(width * ratio)))
+        elif size_adapt in ("自适应", "填充"):
+            resize_size = self._fit_size(height, width, target_size)
+        else:
+            resize_size = target_size
+        method = self._get_resize_method(self.INTERPOLATION_MAP.get(interpolation_mode, cv2.INTER_LINEAR))
+        # 每帧的输入切片、插值结果和留白画布按最大尺寸估算，再加上缩放引擎的中间缓冲
+        # （面积/Lanczos的分离式重采样在引擎内部按平面分块，中间缓冲有上限）
+        frame_bytes = (height * width + 2 * target_height * target_width) * channels * 4
+        frame_bytes += resize_workspace_bytes((height, width), resize_size, method, channels)
+        return max(1, self.CHUNK_MEMORY_BYTES // max(frame_bytes, 1))
+
+    def _plan_chunks(self, batches, chunk_frames):
+        """将一组输入按帧数分块，块可以跨越多个输入
+
+        Yields:
+            (起始帧, [输入的帧切片, ...])，起始帧为在整组输出中的位置
+        """
+        total = sum(batch.shape[0] for batch in batches)
+        for start in range(0, total, chunk_frames):
+            end = min(start + chunk_frames, total)
+            segments = []
+            offset = 0
+            for batch in batches:
+                lo, hi = max(start, offset), min(end, offset + batch.shape[0])
+                if lo < hi:
+                    segments.append(batch[lo - offset:hi - offset])
+                offset += batch.shape[0]
+            yield start, segments
+
+    def resize_images(self, 缩放方法, 宽度, 高度, 尺寸适配, 分块帧数=0, 填充方式="纯色", 填充颜色="#000000",
+                      图片A=None, 图片B=None, 图片C=None, 图片D=None):
         """根据指定参数统一调整所有输入图像的大小"""
         target_size = (高度, 宽度)  # (H, W)
         results = []
@@ -243,14 +304,59 @@ class DDImageUniformSize:
             empty_image = torch.zeros(1, 高度, 宽度, 3)
             return (empty_image,)
         
-        # 处理每个有效输入
-        for img in valid_inputs.values():
-            # 调整图像大小
-            resized = self._resize_batch(img, target_size, 缩放方法, 尺寸适配)
-            results.append(resized)
+        # 相同尺寸的输入共用一个预分配的连续输出，按块缩放后再按原批次拆分为视图
+        # 块可以跨越多个输入，GPU上将块内的切片拼接后一次缩放；CPU上拼接的复制开销
+        # 大于逐个调用的开销，块内各切片分别缩放
+        resized_map = {}
+        for key, members in self._group_inputs(valid_inputs).items():
+            frame_shape, dtype, device = key
+            batches = [img for _, img in members]
+            output = torch.empty((sum(batch.shape[0] for batch in batches), 高度, 宽度, frame_shape[2]),
+                                 dtype=dtype, device=device)
+            chunk = self._chunk_frames(分块帧数, frame_shape, target_size, 缩放方法, 尺寸适配)
+            if (分块帧数 == 0 and 尺寸适配 == "填充" and 填充方式 == "纯色"
+                    and self._fit_size(frame_shape[0], frame_shape[1], target_size) == frame_shape[:2]):
+                # 纯色填充且无需缩放时没有中间结果，整批一次切片赋值
+                chunk = output.shape[0]
+
+            for start, segments in self._plan_chunks(batches, chunk):
+                if len(segments) > 1 and device.type != "cpu":
+                    segments = [torch.cat(segments, dim=0)]
+                for segment in segments:
+                    end = start + segment.shape[0]
+                    self._resize_batch(segment, target_size, 缩放方法, 尺寸适配, out=output[start:end],
+                                       pad_mode=填充方式, fill_color=填充颜色)
+                    start = end
+
+            split = torch.split(output, [batch.shape[0] for batch in batches], dim=0)
+            for (name, _), resized in zip(members, split):
+                resized_map[name] = resized
+
+        for name, img in valid_inputs.items():
+            # 同一个张量接入多个端口时直接复用结果
+            source = next(other for other, other_img in valid_inputs.items() if other_img is img)
+            results.append(resized_map[source])
             
         return tuple(results)
 
+    def _group_inputs(self, valid_inputs):
+        """按尺寸、数据类型和设备对输入分组，同一张量只参与一次计算
+
+        Returns:
+            {分组键: [(输入名称, BHWC张量), ...]}，保持输入顺序
+        """
+        groups = {}
+        seen = []
+        for name, img in valid_inputs.items():
+            if any(img is other for other in seen):
+                continue
+            seen.append(img)
+            if img.dim() == 3:  # 单张图片 [H, W, C]
+                img = img.unsqueeze(0)
+            key = (tuple(img.shape[1:]), img.dtype, img.device)
+            groups.setdefault(key, []).append((name, img))
+        return groups
+
 # 节点类映射
 NODE_CLASS_MAPPINGS = {
     "DD-ImageUniformSize": DDImageUniformSize
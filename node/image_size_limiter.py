@@ -1,13 +1,14 @@
 import torch
 import numpy as np
 import cv2
+from .resize_utils import SIZE_ALIGNMENTS, plan_limited_size, resize_bchw
 from typing import List, Dict, Any, Tuple, Union, Optional
 
 class DDImageSizeLimiter:
     """
     DD 限制图像大小 - 确保图像和遮罩的尺寸在指定的最大和最小范围内
     当图像尺寸超出限制时自动调整，保持原始宽高比
-    支持多个图像和遮罩输入，可选择输出其中一对
+    支持多个图像和遮罩输入，可选择输出其中一对，或批量处理所有接入的图像和遮罩
     """
 
     @classmethod
@@ -19,6 +20,8 @@ class DDImageSizeLimiter:
                 "最小长宽": ("INT", {"default": 256, "min": 8, "max": 4096, "step": 8}),
                 "缩放方法": (["双线性插值", "邻近-精确", "区域", "双三次插值", "lanczos"], {"default": "双线性插值"}),
                 "选择输出": ("INT", {"default": 1, "min": 1, "max": 4, "step": 1}),
+                "批量处理": ("BOOLEAN", {"default": False}),
+                "尺寸对齐": ([str(alignment) for alignment in SIZE_ALIGNMENTS], {"default": "8"}),
             },
             "optional": {
                 "遮罩1": ("MASK",),
@@ -31,8 +34,10 @@ class DDImageSizeLimiter:
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "MASK", "INT", "INT", "INT", "INT")
-    RETURN_NAMES = ("图像", "遮罩", "原始宽度", "原始高度", "新宽度", "新高度")
+    RETURN_TYPES = ("IMAGE", "MASK", "INT", "INT", "INT", "INT",
+                    "IMAGE", "IMAGE", "IMAGE", "IMAGE", "MASK", "MASK", "MASK", "MASK")
+    RETURN_NAMES = ("图像", "遮罩", "原始宽度", "原始高度", "新宽度", "新高度",
+                    "图像1", "图像2", "图像3", "图像4", "遮罩1", "遮罩2", "遮罩3", "遮罩4")
     FUNCTION = "limit_image_size"
     CATEGORY = "🍺DD系列节点"
 
@@ -45,21 +50,23 @@ class DDImageSizeLimiter:
         "lanczos": cv2.INTER_LANCZOS4
     }
 
-    def _get_torch_mode(self, cv2_interpolation):
-        """将OpenCV插值模式转换为PyTorch模式"""
+    def _get_resize_method(self, cv2_interpolation):
+        """将OpenCV插值模式转换为缩放引擎的方法名"""
         if cv2_interpolation in [cv2.INTER_NEAREST, cv2.INTER_NEAREST_EXACT]:
-            return 'nearest'
+            return 'nearest-exact'
         elif cv2_interpolation == cv2.INTER_LINEAR:
             return 'bilinear'
         elif cv2_interpolation == cv2.INTER_CUBIC:
             return 'bicubic'
         elif cv2_interpolation == cv2.INTER_AREA:
             return 'area'
+        elif cv2_interpolation == cv2.INTER_LANCZOS4:
+            return 'lanczos'
         else:
             return 'bilinear'  # 默认返回双线性
 
-    def _resize_batch(self, tensor, new_size, interpolation):
-        """调整批量张量大小"""
+    def _resize_batch(self, tensor, new_size, interpolation, out=None):
+        """调整批量张量大小，提供out时结果写入out"""
         if tensor is None:
             return None
             
@@ -72,57 +79,34 @@ class DDImageSizeLimiter:
         
         # 获取新的高度和宽度
         new_height, new_width = new_size
-        torch_mode = self._get_torch_mode(interpolation)
+        resize_method = self._get_resize_method(interpolation)
         
         # 处理图像张量 [B,H,W,C]
         if is_image:
             # 转换为[B,C,H,W]用于插值
             tensor_bchw = tensor.permute(0, 3, 1, 2)
             
-            # 只在适当的模式下使用align_corners参数
-            if torch_mode in ['bilinear', 'bicubic']:
-                resized = torch.nn.functional.interpolate(
-                    tensor_bchw,
-                    size=(new_height, new_width),
-                    mode=torch_mode,
-                    align_corners=False
-                )
-            else:
-                # 对于'nearest'和'area'模式不使用align_corners参数
-                resized = torch.nn.functional.interpolate(
-                    tensor_bchw,
-                    size=(new_height, new_width),
-                    mode=torch_mode
-                )
+            resized = resize_bchw(tensor_bchw, (new_height, new_width), resize_method)
             
             # 转回[B,H,W,C]
-            return resized.permute(0, 2, 3, 1)
+            resized = resized.permute(0, 2, 3, 1)
         
         # 处理遮罩张量 [B,H,W]
         else:
             # 增加一个通道维度[B,1,H,W]用于插值
             tensor_b1hw = tensor.unsqueeze(1)
             
-            # 只在适当的模式下使用align_corners参数
-            if torch_mode in ['bilinear', 'bicubic']:
-                resized = torch.nn.functional.interpolate(
-                    tensor_b1hw,
-                    size=(new_height, new_width),
-                    mode=torch_mode,
-                    align_corners=False
-                )
-            else:
-                # 对于'nearest'和'area'模式不使用align_corners参数
-                resized = torch.nn.functional.interpolate(
-                    tensor_b1hw,
-                    size=(new_height, new_width),
-                    mode=torch_mode
-                )
+            resized = resize_bchw(tensor_b1hw, (new_height, new_width), resize_method)
             
             # 移除添加的通道维度，返回[B,H,W]
-            return resized.squeeze(1)
+            resized = resized.squeeze(1)
 
-    def _calculate_new_dimensions(self, width, height, max_size, min_size):
+        if out is None:
+            return resized
+        out.copy_(resized)
+        return out
+
+    def _calculate_new_dimensions(self, width, height, max_size, min_size, alignment=8):
         """
         计算新的图像尺寸，确保在最大和最小限制内，保持宽高比
         
@@ -130,50 +114,102 @@ class DDImageSizeLimiter:
         1. 如果长边超过max_size，按长边缩放到max_size
         2. 如果长边小于min_size，按长边放大到min_size
         3. 否则保持原尺寸
-        
-        注意：这里的逻辑是基于长边来控制图像尺寸
+        最后向上对齐到alignment的倍数（会超过max_size时向下对齐），计算结果由plan_limited_size缓存
         """
-        # 获取原始宽高比
-        aspect_ratio = width / height
-        
-        # 确定长边和短边
-        long_side = max(width, height)
-        short_side = min(width, height)
-        
-        new_width = width
-        new_height = height
-        
-        # 检查长边是否超过最大限制
-        if long_side > max_size:
-            # 按长边缩放到max_size
-            if width >= height:
-                # 宽度是长边
-                new_width = max_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                # 高度是长边
-                new_height = max_size
-                new_width = int(new_height * aspect_ratio)
-        
-        # 检查长边是否小于最小限制
-        elif long_side < min_size:
-            # 按长边放大到min_size
-            if width >= height:
-                # 宽度是长边
-                new_width = min_size
-                new_height = int(new_width / aspect_ratio)
-            else:
-                # 高度是长边
-                new_height = min_size
-                new_width = int(new_height * aspect_ratio)
-            
-        # 确保尺寸总是8的倍数
-        new_width = ((new_width + 7) // 8) * 8
-        new_height = ((new_height + 7) // 8) * 8
-            
-        return new_width, new_height
+        return plan_limited_size(width, height, max_size, min_size, alignment)
+
+    def _resize_group(self, tensors, new_size, interpolation):
+        """
+        将一组尺寸相同的张量缩放到new_size，写入同一个预分配的输出缓冲区
+
+        GPU上拼接后一次缩放；CPU上拼接的复制开销大于逐个调用的开销，逐个写入缓冲区
+
+        Returns:
+            与tensors一一对应的结果视图列表
+        """
+        new_height, new_width = new_size
+        sizes = [tensor.shape[0] for tensor in tensors]
+        first = tensors[0]
+        if len(tensors) > 1 and first.device.type != "cpu":
+            merged = self._resize_batch(torch.cat(tensors, dim=0), new_size, interpolation)
+            return list(torch.split(merged, sizes, dim=0))
+
+        buffer = torch.empty((sum(sizes), new_height, new_width) + tuple(first.shape[3:]),
+                             dtype=first.dtype, device=first.device)
+        start = 0
+        for tensor in tensors:
+            end = start + tensor.shape[0]
+            self._resize_batch(tensor, new_size, interpolation, out=buffer[start:end])
+            start = end
+        return list(torch.split(buffer, sizes, dim=0))
+
+    def _limit_pairs(self, pairs, 最大长宽, 最小长宽, 缩放方法, 尺寸对齐=8):
+        """
+        限制多组图像和遮罩的尺寸
+
+        目标尺寸按分辨率缓存；相同形状的图像一起缩放，遮罩按各自的源尺寸和目标尺寸一起缩放
 
-    def limit_image_size(self, 图像1, 最大长宽, 最小长宽, 缩放方法, 选择输出, 
+        Args:
+            pairs: [(序号, 图像[B,H,W,C], 遮罩[B,H,W]或None), ...]
+        Returns:
+            {序号: (图像, 遮罩, 原始宽度, 原始高度, 新宽度, 新高度)}
+        """
+        interpolation = self.INTERPOLATION_MAP.get(缩放方法, cv2.INTER_LINEAR)
+        # 对遮罩使用邻近插值以保持边缘清晰
+        mask_interpolation = cv2.INTER_NEAREST_EXACT
+        image_groups = {}
+        mask_groups = {}
+        plans = {}
+
+        for index, image, mask in pairs:
+            batch_size, height, width, channels = image.shape
+            new_width, new_height = self._calculate_new_dimensions(width, height, 最大长宽, 最小长宽, 尺寸对齐)
+            plans[index] = (width, height, new_width, new_height)
+
+            if (new_width, new_height) == (width, height):
+                print(f"[限制图像大小] 图像{index+1}尺寸已在范围内 {width}x{height}，无需调整")
+                continue
+            print(f"[限制图像大小] 调整图像{index+1}尺寸: {width}x{height} -> {new_width}x{new_height}")
+            image_key = (tuple(image.shape[1:]), image.dtype, image.device)
+            image_groups.setdefault(image_key, []).append((index, image))
+            if mask is not None:
+                mask_key = (tuple(mask.shape[1:]), mask.dtype, mask.device, (new_height, new_width))
+                mask_groups.setdefault(mask_key, []).append((index, mask))
+
+        resized_images = {}
+        for members in image_groups.values():
+            width, height, new_width, new_height = plans[members[0][0]]
+            outputs = self._resize_group([image for _, image in members], (new_height, new_width), interpolation)
+            resized_images.update((index, output) for (index, _), output in zip(members, outputs))
+
+        resized_masks = {}
+        for key, members in mask_groups.items():
+            outputs = self._resize_group([mask for _, mask in members], key[3], mask_interpolation)
+            resized_masks.update((index, output) for (index, _), output in zip(members, outputs))
+
+        results = {}
+        for index, image, mask in pairs:
+            width, height, new_width, new_height = plans[index]
+            调整后图像 = resized_images.get(index, image)
+            调整后遮罩 = resized_masks.get(index, mask)
+            # 处理空遮罩情况
+            if 调整后遮罩 is None:
+                # 创建一个空遮罩
+                调整后遮罩 = torch.ones((image.shape[0], new_height, new_width), device=image.device)
+            results[index] = (调整后图像, 调整后遮罩, width, height, new_width, new_height)
+        return results
+
+    def _passthrough_pair(self, image, mask):
+        """未处理的组：图像和遮罩原样返回，缺少遮罩时补全与图像同尺寸的全1遮罩"""
+        if len(image.shape) == 3:
+            image = image.unsqueeze(0)
+        if mask is None:
+            mask = torch.ones(image.shape[:3], device=image.device)
+        elif len(mask.shape) == 2:
+            mask = mask.unsqueeze(0)
+        return (image, mask)
+
+    def limit_image_size(self, 图像1, 最大长宽, 最小长宽, 缩放方法, 选择输出, 批量处理=False, 尺寸对齐="8",
                   遮罩1=None, 图像2=None, 遮罩2=None, 图像3=None, 遮罩3=None, 图像4=None, 遮罩4=None):
         """
         限制多组图像和遮罩的尺寸，使其在指定的最大和最小范围内，并选择输出其中一组
@@ -185,9 +221,13 @@ class DDImageSizeLimiter:
             最小长宽: 图像尺寸的最小限制
             缩放方法: 用于调整大小的插值方法
             选择输出: 选择输出第几组图像和遮罩（1-4）
+            批量处理: 是否处理所有接入的图像和遮罩，结果从图像1-4/遮罩1-4输出；
+                关闭时只处理选定的组，其余接入的组原样输出
+            尺寸对齐: 新尺寸对齐的倍数（8/16/64），不会超过最大长宽
             
         Returns:
-            选定的调整大小后的图像和遮罩，以及原始和新的尺寸信息
+            选定的调整大小后的图像和遮罩，原始和新的尺寸信息，以及各组的图像和遮罩
+            （未接入的组输出None）
         """
         # 创建图像和遮罩的列表
         图像列表 = [图像1, 图像2, 图像3, 图像4]
@@ -201,52 +241,31 @@ class DDImageSizeLimiter:
             print(f"[限制图像大小] 警告：图像{选择索引+1}不存在，默认使用图像1")
             选择索引 = 0
         
-        # 获取要处理的图像和遮罩
-        当前图像 = 图像列表[选择索引]
-        当前遮罩 = 遮罩列表[选择索引]
-        
-        # 对单张图像进行处理
-        if len(当前图像.shape) == 3:  # [H,W,C]
-            当前图像 = 当前图像.unsqueeze(0)  # 添加批次维度 [1,H,W,C]
-        
-        # 处理遮罩
-        if 当前遮罩 is not None and len(当前遮罩.shape) == 2:  # [H,W]
-            当前遮罩 = 当前遮罩.unsqueeze(0)  # 添加批次维度 [1,H,W]
-        
-        # 获取原始尺寸
-        batch_size, height, width, channels = 当前图像.shape
-        原始宽度, 原始高度 = width, height
-        
-        # 计算新尺寸
-        新宽度, 新高度 = self._calculate_new_dimensions(width, height, 最大长宽, 最小长宽)
-        
-        # 检查是否需要调整大小
-        if 新宽度 != 原始宽度 or 新高度 != 原始高度:
-            print(f"[限制图像大小] 调整图像{选择索引+1}尺寸: {原始宽度}x{原始高度} -> {新宽度}x{新高度}")
+        # 批量处理时处理所有接入的组，否则只处理选定的组
+        索引列表 = [i for i in range(4) if 图像列表[i] is not None] if 批量处理 else [选择索引]
+        pairs = []
+        for index in 索引列表:
+            当前图像 = 图像列表[index]
+            当前遮罩 = 遮罩列表[index]
             
-            # 获取插值方法
-            interpolation = self.INTERPOLATION_MAP.get(缩放方法, cv2.INTER_LINEAR)
+            # 对单张图像进行处理
+            if len(当前图像.shape) == 3:  # [H,W,C]
+                当前图像 = 当前图像.unsqueeze(0)  # 添加批次维度 [1,H,W,C]
             
-            # 调整图像大小
-            调整后图像 = self._resize_batch(当前图像, (新高度, 新宽度), interpolation)
-            
-            # 如果有遮罩，也调整遮罩大小
-            调整后遮罩 = None
-            if 当前遮罩 is not None:
-                # 对遮罩使用邻近插值以保持边缘清晰
-                mask_interpolation = cv2.INTER_NEAREST_EXACT
-                调整后遮罩 = self._resize_batch(当前遮罩, (新高度, 新宽度), mask_interpolation)
-        else:
-            print(f"[限制图像大小] 图像{选择索引+1}尺寸已在范围内 {原始宽度}x{原始高度}，无需调整")
-            调整后图像 = 当前图像
-            调整后遮罩 = 当前遮罩
-            
-        # 处理空遮罩情况
-        if 调整后遮罩 is None:
-            # 创建一个空遮罩
-            调整后遮罩 = torch.ones((batch_size, 新高度, 新宽度), device=当前图像.device)
+            # 处理遮罩
+            if 当前遮罩 is not None and len(当前遮罩.shape) == 2:  # [H,W]
+                当前遮罩 = 当前遮罩.unsqueeze(0)  # 添加批次维度 [1,H,W]
+            pairs.append((index, 当前图像, 当前遮罩))
+        
+        results = self._limit_pairs(pairs, 最大长宽, 最小长宽, 缩放方法, int(尺寸对齐))
+        # 未处理但已接入的组原样输出，保证连接到这些输出的下游节点始终拿到有效数据
+        for index in range(4):
+            if index not in results and 图像列表[index] is not None:
+                results[index] = self._passthrough_pair(图像列表[index], 遮罩列表[index])
+        图像输出 = tuple(results[i][0] if i in results else None for i in range(4))
+        遮罩输出 = tuple(results[i][1] if i in results else None for i in range(4))
             
-        return (调整后图像, 调整后遮罩, 原始宽度, 原始高度, 新宽度, 新高度)
+        return results[选择索引] + 图像输出 + 遮罩输出
 
 # 节点类映射
 NODE_CLASS_MAPPINGS = {
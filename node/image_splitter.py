@@ -1,7 +1,3 @@
-import torch
-import numpy as np
-from PIL import Image
-
 class DDImageSplitter:
     """
     DD 图像切分器
@@ -20,41 +16,35 @@ class DDImageSplitter:
             }
         }
     
-    RETURN_TYPES = ("IMAGE",)
-    RETURN_NAMES = ("图像",)
+    RETURN_TYPES = ("IMAGE", "IMAGE")
+    RETURN_NAMES = ("图像", "全部切片")
+    OUTPUT_IS_LIST = (False, True)
     FUNCTION = "split_image"
     CATEGORY = "🍺DD系列节点"
     
     def split_image(self, 图像, 切分方向, 切分份数, 输出位置, 切分比例):
         """
-        切分图像并返回指定位置的部分
+        切分整批图像，返回指定位置的部分以及全部切片
+        
+        切片都是输入张量的视图，不复制数据
         """
         # 确保输出位置在有效范围内
         if 输出位置 > 切分份数:
             输出位置 = 切分份数
         
-        # 转换tensor到PIL Image
-        image_tensor = 图像[0] if len(图像.shape) == 4 else 图像
-        image_np = (image_tensor.cpu().numpy() * 255).astype(np.uint8)
-        image_pil = Image.fromarray(image_np)
-        
-        width, height = image_pil.size
+        image_tensor = 图像 if len(图像.shape) == 4 else 图像.unsqueeze(0)
         
         # 解析切分比例
         ratios = self.parse_ratios(切分比例, 切分份数)
         
         if 切分方向 == "左右":
             # 左右切分
-            split_image = self.split_horizontal(image_pil, ratios, 输出位置)
+            segments = self.split_horizontal(image_tensor, ratios)
         else:
             # 上下切分
-            split_image = self.split_vertical(image_pil, ratios, 输出位置)
+            segments = self.split_vertical(image_tensor, ratios)
         
-        # 转换回tensor
-        result_np = np.array(split_image).astype(np.float32) / 255.0
-        result_tensor = torch.from_numpy(result_np).unsqueeze(0)
-        
-        return (result_tensor,)
+        return (segments[输出位置 - 1], segments)
     
     def parse_ratios(self, 切分比例, 切分份数):
         """
@@ -78,47 +68,34 @@ class DDImageSplitter:
         total = sum(ratios)
         return [r / total for r in ratios]
     
-    def split_horizontal(self, image, ratios, 输出位置):
+    def segment_bounds(self, size, ratios):
         """
-        水平切分（左右切分）
+        按比例计算每部分的起止位置
         """
-        width, height = image.size
-        
-        # 计算每部分的宽度
-        widths = [int(width * ratio) for ratio in ratios]
-        
-        # 调整最后一个宽度以确保总和等于原宽度
-        widths[-1] = width - sum(widths[:-1])
-        
-        # 计算切分位置的起始x坐标
-        start_x = sum(widths[:输出位置-1])
-        end_x = start_x + widths[输出位置-1]
-        
-        # 裁剪图像
-        cropped_image = image.crop((start_x, 0, end_x, height))
-        
-        return cropped_image
+        # 计算每部分的长度
+        lengths = [int(size * ratio) for ratio in ratios]
+        
+        # 调整最后一个长度以确保总和等于原长度
+        lengths[-1] = size - sum(lengths[:-1])
+        
+        bounds = []
+        start = 0
+        for length in lengths:
+            bounds.append((start, start + length))
+            start += length
+        return bounds
     
-    def split_vertical(self, image, ratios, 输出位置):
+    def split_horizontal(self, images, ratios):
         """
-        垂直切分（上下切分）
+        水平切分（左右切分），images为[B,H,W,C]
         """
-        width, height = image.size
-        
-        # 计算每部分的高度
-        heights = [int(height * ratio) for ratio in ratios]
-        
-        # 调整最后一个高度以确保总和等于原高度
-        heights[-1] = height - sum(heights[:-1])
-        
-        # 计算切分位置的起始y坐标
-        start_y = sum(heights[:输出位置-1])
-        end_y = start_y + heights[输出位置-1]
-        
-        # 裁剪图像
-        cropped_image = image.crop((0, start_y, width, end_y))
-        
-        return cropped_image
+        return [images[:, :, start:end] for start, end in self.segment_bounds(images.shape[2], ratios)]
+    
+    def split_vertical(self, images, ratios):
+        """
+        垂直切分（上下切分），images为[B,H,W,C]
+        """
+        return [images[:, start:end] for start, end in self.segment_bounds(images.shape[1], ratios)]
 
 
 # 节点类映射
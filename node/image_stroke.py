@@ -19,6 +19,7 @@ class DDImageStroke:
                 "大小": ("INT", {"default": 5, "min": 1, "max": 200, "step": 1}),
                 "不透明度": ("INT", {"default": 100, "min": 1, "max": 100, "step": 1}),
                 "描边颜色": ("COLOR", {"default": "#000000"}),
+                "描边算法": (["形态学", "距离场"], {"default": "形态学"}),
             },
             "optional": {
                 "遮罩": ("MASK",),
@@ -30,6 +31,9 @@ class DDImageStroke:
     FUNCTION = "add_stroke"
     CATEGORY = "🍺DD系列节点"
     
+    # 批量描边引擎每个帧块处理的像素数上限
+    STROKE_CHUNK_PIXELS = 16 * 1024 * 1024
+    
     def hex_to_rgb(self, hex_color):
         """将十六进制颜色转换为RGB"""
         try:
@@ -250,7 +254,23 @@ class DDImageStroke:
         
         return result
     
-    def add_stroke(self, 图片, 关闭遮罩, 位置, 大小, 不透明度, 描边颜色, 遮罩=None):
+    def parse_stroke_color(self, 描边颜色, 不透明度):
+        """解析描边颜色（支持COLOR类型、整数和字符串格式），返回0-255的RGBA元组"""
+        if isinstance(描边颜色, str):
+            # COLOR类型会传入字符串格式的十六进制颜色
+            stroke_rgb = self.hex_to_rgb(描边颜色)
+        elif isinstance(描边颜色, (int, float)):
+            # 向后兼容整数格式
+            stroke_rgb = self.int_to_rgb(描边颜色)
+        else:
+            # 默认使用白色
+            stroke_rgb = (255, 255, 255)
+        
+        # 将1-100的不透明度转换为0-255的alpha值
+        alpha_value = int((不透明度 / 100.0) * 255)
+        return stroke_rgb + (alpha_value,)
+    
+    def add_stroke(self, 图片, 关闭遮罩, 位置, 大小, 不透明度, 描边颜色, 描边算法="形态学", 遮罩=None):
         """
         为图片添加描边效果
         
@@ -261,11 +281,259 @@ class DDImageStroke:
             大小: 描边大小(像素)
             不透明度: 描边不透明度(1-100)
             描边颜色: 描边颜色(COLOR类型，如"#FFFFFF")
+            描边算法: 透明图描边遮罩的计算方式("形态学"为椭圆膨胀/腐蚀，
+                      "距离场"基于欧氏距离场，带抗锯齿且耗时与描边大小无关)
             遮罩: 可选的遮罩tensor，用于定义透明区域
             
         Returns:
             描边后的图片tensor
         """
+        # 优先使用张量批量引擎，整批一次完成描边计算和合成
+        try:
+            stroke_color = self.parse_stroke_color(描边颜色, 不透明度)
+            mask = 遮罩 if not 关闭遮罩 else None
+            result = self.add_stroke_batch(图片, mask, 位置, 大小, stroke_color, 描边算法)
+            if result is not None:
+                return (result,)
+        except Exception as e:
+            print(f"DD图片描边节点批量处理失败，回退到逐帧处理: {str(e)}")
+        
+        return self.add_stroke_per_frame(图片, 关闭遮罩, 位置, 大小, 不透明度, 描边颜色, 遮罩, 描边算法)
+    
+    def add_stroke_batch(self, 图片, 遮罩, 位置, 大小, stroke_color, 描边算法="形态学"):
+        """
+        张量批量描边引擎
+        
+        整批图片一次性计算描边遮罩并在张量空间完成合成，不经过PIL转换。
+        无法批量处理的情况（如遮罩数量与图片不对应）返回None，由逐帧处理兜底；
+        CPU上透明图逐帧的cv2形态学和PIL 8位合成比张量实现更快，同样返回None交给逐帧处理
+        """
+        if 图片.dim() == 3:
+            图片 = 图片.unsqueeze(0)
+        batch_size, height, width, channels = 图片.shape
+        
+        alpha = None
+        if channels == 4:
+            # 原本就是RGBA图像（透明图），遮罩不生效
+            rgb = 图片[..., :3]
+            alpha = 图片[..., 3]
+        elif channels == 3 and 遮罩 is not None:
+            # 遮罩接入时默认就是反转状态
+            if 遮罩.dim() == 2:
+                遮罩 = 遮罩.unsqueeze(0)
+            if 遮罩.shape[0] != 1 and 遮罩.shape[0] < batch_size:
+                return None
+            if tuple(遮罩.shape[1:]) != (height, width):
+                return None
+            rgb = 图片
+            alpha = 1.0 - 遮罩[:batch_size].to(device=图片.device, dtype=图片.dtype).expand(batch_size, -1, -1)
+        
+        if alpha is None:
+            # 普通图片：直接在张量上填充边框区域
+            if channels not in (1, 3):
+                return None
+            return self.create_stroke_for_normal_tensor(图片, 大小, 位置, stroke_color)
+        
+        if 图片.device.type == "cpu":
+            return None
+        
+        # 按帧块处理，控制中间张量的大小
+        chunk = max(1, self.STROKE_CHUNK_PIXELS // (height * width))
+        result = 图片.new_empty((batch_size, height, width, 4))
+        for start in range(0, batch_size, chunk):
+            end = min(start + chunk, batch_size)
+            if 描边算法 == "距离场":
+                stroke_mask = self.create_stroke_mask_distance_tensor(alpha[start:end], 大小, 位置)
+            else:
+                stroke_mask = self.create_stroke_mask_tensor(alpha[start:end], 大小, 位置)
+            self.composite_stroke_tensor(rgb[start:end], alpha[start:end], stroke_mask,
+                                         stroke_color, 位置, out=result[start:end])
+        
+        return result
+    
+    def create_stroke_for_normal_tensor(self, 图片, stroke_size, position, stroke_color):
+        """
+        为普通图片（非透明图）批量创建描边效果，与create_stroke_for_normal_image结果一致
+        
+        画布扩展和边框绘制都是对整批图片的切片赋值，耗时与描边大小无关
+        """
+        batch_size, height, width, channels = 图片.shape
+        color = torch.tensor(stroke_color, dtype=图片.dtype, device=图片.device) / 255.0
+        
+        if position == "外描边":
+            # 扩展画布，原图放在中心，四周整圈为描边
+            offset = stroke_size
+            border = stroke_size
+        elif position == "内描边":
+            # 画布不变，在图像内部边缘绘制描边
+            offset = 0
+            border = stroke_size
+        else:  # 居中描边
+            # 画布扩展半个描边宽度，从画布边缘向内绘制描边
+            offset = stroke_size // 2
+            border = stroke_size
+        
+        result = 图片.new_zeros((batch_size, height + offset * 2, width + offset * 2, 4))
+        result[:, offset:offset + height, offset:offset + width, :3] = 图片 if channels == 3 else 图片.expand(-1, -1, -1, 3)
+        result[:, offset:offset + height, offset:offset + width, 3] = 1.0
+        
+        # 填充四条边框
+        out_height, out_width = result.shape[1:3]
+        result[:, :border] = color
+        result[:, max(0, out_height - border):] = color
+        result[:, :, :border] = color
+        result[:, :, max(0, out_width - border):] = color
+        
+        return result
+    
+    def create_stroke_mask_tensor(self, alpha, stroke_size, position):
+        """批量创建描边遮罩，alpha形状为[B,H,W]，取值0-1"""
+        alpha = alpha.unsqueeze(1)
+        
+        if position == "外描边":
+            # 膨胀后减去原图（传统外描边）
+            dilated = self.morphology_tensor(alpha, stroke_size * 2 + 1, "dilate")
+            stroke_mask = (dilated - alpha).clamp_(min=0)
+        elif position == "内描边":
+            # 原图减去腐蚀后的结果（传统内描边）
+            eroded = self.morphology_tensor(alpha, stroke_size * 2 + 1, "erode")
+            stroke_mask = (alpha - eroded).clamp_(min=0)
+        else:  # 居中描边
+            # 膨胀后减去腐蚀后的结果（传统居中描边）
+            half_kernel = max(1, stroke_size) + 1
+            dilated = self.morphology_tensor(alpha, half_kernel, "dilate")
+            eroded = self.morphology_tensor(alpha, half_kernel, "erode")
+            stroke_mask = (dilated - eroded).clamp_(min=0)
+        
+        return stroke_mask.squeeze(1)
+    
+    def create_stroke_mask_distance(self, alpha, stroke_size, position):
+        """
+        基于欧氏距离场创建描边遮罩，alpha为[H,W]的numpy数组，取值0-1
+        
+        对alpha二值化后分别计算内外两侧的距离变换，合成以轮廓为零点的有符号距离场，
+        三种描边都是该距离场的阈值区间；利用小数距离得到抗锯齿边缘，
+        计算量只与图像尺寸有关，与描边大小无关
+        """
+        inside = (alpha >= 0.5).astype(np.uint8)
+        
+        # 外部像素到轮廓的距离为正，内部像素为负，轮廓位于相邻像素之间
+        dist_out = cv2.distanceTransform(1 - inside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        dist_in = cv2.distanceTransform(inside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        signed = np.where(inside > 0, 0.5 - dist_in, dist_out - 0.5)
+        
+        if position == "外描边":
+            dilated = np.clip(stroke_size + 0.5 - signed, 0, 1)
+            stroke_mask = dilated - alpha
+        elif position == "内描边":
+            eroded = np.clip(0.5 - stroke_size - signed, 0, 1)
+            stroke_mask = alpha - eroded
+        else:  # 居中描边
+            half_size = stroke_size / 2
+            dilated = np.clip(half_size + 0.5 - signed, 0, 1)
+            eroded = np.clip(0.5 - half_size - signed, 0, 1)
+            stroke_mask = dilated - eroded
+        
+        return np.clip(stroke_mask, 0, 1).astype(np.float32)
+    
+    def create_stroke_mask_distance_tensor(self, alpha, stroke_size, position):
+        """批量计算距离场描边遮罩，alpha形状为[B,H,W]"""
+        alpha_np = alpha.detach().float().cpu().numpy()
+        stroke_mask = np.stack([
+            self.create_stroke_mask_distance(frame, stroke_size, position) for frame in alpha_np
+        ])
+        return torch.from_numpy(stroke_mask).to(device=alpha.device, dtype=alpha.dtype)
+    
+    def morphology_tensor(self, x, kernel_size, op):
+        """
+        使用椭圆结构元素对[B,1,H,W]张量做膨胀或腐蚀，与cv2.dilate/cv2.erode一致
+        
+        椭圆每一行都是连续区间，先按区间长度递增地计算水平滑动最大值，
+        再按行偏移取最大值，每个像素的计算量随半径线性增长
+        """
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+        anchor = kernel_size // 2
+        height, width = x.shape[2:]
+        
+        # 腐蚀等价于对取反后的图像做膨胀；图像外的像素不参与计算
+        src = -x if op == "erode" else x
+        padded = torch.nn.functional.pad(
+            src,
+            (anchor, kernel_size - 1 - anchor, anchor, kernel_size - 1 - anchor),
+            value=float("-inf")
+        )
+        padded_width = padded.shape[3]
+        
+        # 每行椭圆区间的起点和长度，按长度排序后复用滑动最大值
+        rows = []
+        for row in range(kernel_size):
+            cols = np.flatnonzero(kernel[row])
+            if len(cols) > 0:
+                rows.append((len(cols), row, int(cols[0])))
+        rows.sort()
+        
+        window = padded.clone()
+        window_length = 1
+        result = None
+        for length, row, start in rows:
+            while window_length < length:
+                # window[x] = max(padded[x : x + window_length])
+                valid = padded_width - window_length
+                torch.maximum(window[..., :valid], padded[..., window_length:], out=window[..., :valid])
+                window_length += 1
+            shifted = window[:, :, row:row + height, start:start + width]
+            if result is None:
+                result = shifted.clone()
+            else:
+                torch.maximum(result, shifted, out=result)
+        
+        return -result if op == "erode" else result
+    
+    def composite_stroke_tensor(self, rgb, alpha, stroke_mask, stroke_color, position, out=None):
+        """
+        在张量空间合成描边图层，输出RGBA，与PIL的composite加alpha_composite结果一致
+        
+        描边图层为纯色图层按描边遮罩与全透明图层混合，即颜色color*m、透明度a*m。
+        合成权重只在单通道上计算，三通道数据各只读写一次；
+        合成后完全透明的像素与PIL一样保留底层颜色
+        """
+        if out is None:
+            out = rgb.new_empty(rgb.shape[:3] + (4,))
+        color = torch.tensor(stroke_color, dtype=rgb.dtype, device=rgb.device) / 255.0
+        
+        mask = stroke_mask.unsqueeze(-1)
+        stroke_alpha = color[3] * mask
+        image_alpha = alpha.unsqueeze(-1)
+        
+        if position == "外描边":
+            # 外描边在底层
+            src_alpha, dst_alpha = image_alpha, stroke_alpha
+        else:
+            # 内描边和居中描边在顶层
+            src_alpha, dst_alpha = stroke_alpha, image_alpha
+        
+        # out_alpha = src_alpha + dst_alpha * (1 - src_alpha)
+        # out_rgb = (src_rgb * src_alpha + dst_rgb * dst_weight) / out_alpha
+        dst_weight = dst_alpha * (1.0 - src_alpha)
+        out_alpha = src_alpha + dst_weight
+        visible = out_alpha > 0
+        inv_alpha = torch.where(visible, 1.0 / out_alpha.clamp(min=1e-8), torch.zeros_like(out_alpha))
+        src_coef = src_alpha * inv_alpha
+        dst_coef = torch.where(visible, dst_weight * inv_alpha, torch.ones_like(out_alpha))
+        
+        if position == "外描边":
+            image_coef, stroke_coef = src_coef, dst_coef
+        else:
+            image_coef, stroke_coef = dst_coef, src_coef
+        
+        out_rgb = out[..., :3]
+        torch.mul(rgb, image_coef, out=out_rgb)
+        out_rgb.addcmul_(mask * stroke_coef, color[:3])
+        out[..., 3:] = out_alpha
+        return out
+    
+    def add_stroke_per_frame(self, 图片, 关闭遮罩, 位置, 大小, 不透明度, 描边颜色, 遮罩=None, 描边算法="形态学"):
+        """逐帧经PIL处理的描边实现，用于批量引擎无法处理的情况"""
         try:
             # 批处理
             batch_size = 图片.shape[0]
@@ -285,21 +553,8 @@ class DDImageStroke:
                 # 转换为PIL图像，应用遮罩（默认反转）
                 pil_image, is_transparent_image = self.tensor_to_pil(图片[i:i+1], current_mask)
                 
-                # 解析描边颜色（支持COLOR类型、整数和字符串格式）
-                if isinstance(描边颜色, str):
-                    # COLOR类型会传入字符串格式的十六进制颜色
-                    stroke_rgb = self.hex_to_rgb(描边颜色)
-                elif isinstance(描边颜色, (int, float)):
-                    # 向后兼容整数格式
-                    stroke_rgb = self.int_to_rgb(描边颜色)
-                else:
-                    # 默认使用白色
-                    stroke_rgb = (255, 255, 255)
-                
-                # 创建描边颜色（包含透明度）
-                # 将1-100的不透明度转换为0-255的alpha值
-                alpha_value = int((不透明度 / 100.0) * 255)
-                stroke_color = stroke_rgb + (alpha_value,)
+                # 解析描边颜色（包含透明度）
+                stroke_color = self.parse_stroke_color(描边颜色, 不透明度)
                 
                 # 根据图像类型使用不同的描边逻辑
                 if is_transparent_image:
@@ -310,7 +565,12 @@ class DDImageStroke:
                     
                     # 使用OpenCV创建描边遮罩（性能更好）
                     try:
-                        stroke_mask = self.create_stroke_mask_cv2(pil_image, 大小, 位置)
+                        if 描边算法 == "距离场":
+                            alpha = np.array(pil_image.split()[-1]).astype(np.float32) / 255.0
+                            stroke_mask = self.create_stroke_mask_distance(alpha, 大小, 位置)
+                            stroke_mask = Image.fromarray((stroke_mask * 255).round().astype(np.uint8), 'L')
+                        else:
+                            stroke_mask = self.create_stroke_mask_cv2(pil_image, 大小, 位置)
                     except:
                         # 如果OpenCV方法失败，使用PIL方法作为后备
                         stroke_mask = self.create_stroke_mask_pil(pil_image, 大小, 位置)
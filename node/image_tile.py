@@ -0,0 +1,201 @@
+import math
+import torch
+
+# 分块信息的自定义类型，在切分节点与合并节点之间传递分块坐标
+TILE_INFO_TYPE = "DD_TILE_INFO"
+
+
+def _tile_starts(size, tile, overlap):
+    """
+    计算一个方向上各分块的起始位置
+
+    分块数按最小重叠量确定，起点在[0, size - tile]内均匀分布，
+    首块贴齐起始边、末块贴齐结束边，实际重叠不小于overlap
+    """
+    if tile >= size:
+        return [0]
+    stride = max(tile - overlap, 1)
+    count = math.ceil((size - tile) / stride) + 1
+    return [round(i * (size - tile) / (count - 1)) for i in range(count)]
+
+
+def _feather_weights(starts, tile, feather):
+    """
+    计算一个方向上每个分块的融合权重[分块数, tile]
+
+    与相邻分块重叠的区域使用线性渐变，渐变宽度为重叠宽度乘以feather，
+    并位于重叠区域中央；feather为0时在重叠中线处硬切换。
+    相邻分块在重叠区内的权重互补，非重叠区域权重为1
+    """
+    position = torch.arange(tile, dtype=torch.float32) + 0.5
+    weights = torch.ones(len(starts), tile)
+    for i, start in enumerate(starts):
+        if i > 0:
+            overlap = starts[i - 1] + tile - start
+            if overlap > 0:
+                weights[i] *= _ramp(position, overlap, feather)
+        if i < len(starts) - 1:
+            overlap = start + tile - starts[i + 1]
+            if overlap > 0:
+                weights[i] *= _ramp(tile - position, overlap, feather)
+    return weights
+
+
+def _ramp(distance, overlap, feather):
+    """从分块边缘起distance处的渐变权重，在重叠宽度overlap的中央由0过渡到1"""
+    width = overlap * feather
+    center = overlap / 2
+    if width <= 0:
+        return (distance >= center).float()
+    return ((distance - center) / width + 0.5).clamp(0.0, 1.0)
+
+
+def _scale_starts(starts, scale, tile, size):
+    """将分块起点按缩放倍数映射到新尺寸，保证分块不越界"""
+    return [min(round(start * scale), size - tile) for start in starts]
+
+
+class DDImageTileSplitter:
+    """
+    DD 图像分块切分器
+    按二维网格将图像切分为带重叠的等尺寸分块，所有分块作为一个批次输出，
+    并附带分块坐标信息供合并节点还原
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "图像": ("IMAGE",),
+                "分块宽度": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8}),
+                "分块高度": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8}),
+                "重叠像素": ("INT", {"default": 64, "min": 0, "max": 1024, "step": 8}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", TILE_INFO_TYPE)
+    RETURN_NAMES = ("分块", "分块信息")
+    FUNCTION = "split_tiles"
+    CATEGORY = "🍺DD系列节点"
+
+    def split_tiles(self, 图像, 分块宽度, 分块高度, 重叠像素):
+        """
+        切分整批图像
+
+        输出批次按帧优先排列：第b帧的第t个分块位于索引 b * 分块数 + t
+        """
+        image = 图像 if len(图像.shape) == 4 else 图像.unsqueeze(0)
+        batch, height, width, channels = image.shape
+
+        # 图像小于分块尺寸时分块尺寸取图像尺寸
+        tile_w = min(分块宽度, width)
+        tile_h = min(分块高度, height)
+        # 重叠不超过分块尺寸的一半，避免分块数量失控
+        overlap = min(重叠像素, tile_w // 2, tile_h // 2)
+        if overlap < 重叠像素:
+            print(f"[图像分块] 重叠像素 {重叠像素} 超过分块尺寸的一半，已调整为 {overlap}")
+        xs = _tile_starts(width, tile_w, overlap)
+        ys = _tile_starts(height, tile_h, overlap)
+        coords = [(y, x) for y in ys for x in xs]
+
+        tiles = image.new_empty((batch, len(coords), tile_h, tile_w, channels))
+        for t, (y, x) in enumerate(coords):
+            tiles[:, t] = image[:, y:y + tile_h, x:x + tile_w]
+
+        tile_info = {
+            "image_size": (height, width),
+            "tile_size": (tile_h, tile_w),
+            "xs": xs,
+            "ys": ys,
+            "batch": batch,
+        }
+        print(f"[图像分块] {width}x{height} 切分为 {len(xs)}x{len(ys)} 个 {tile_w}x{tile_h} 分块，共 {batch * len(coords)} 块")
+        return (tiles.view(-1, tile_h, tile_w, channels), tile_info)
+
+
+class DDImageTileMerger:
+    """
+    DD 图像分块合并器
+    将处理后的分块按分块信息拼回完整图像，重叠区域羽化融合；
+    分块被整体放大或缩小时按相同倍数还原
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "分块": ("IMAGE",),
+                "分块信息": (TILE_INFO_TYPE,),
+                "羽化比例": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0, "step": 0.05}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("图像",)
+    FUNCTION = "merge_tiles"
+    CATEGORY = "🍺DD系列节点"
+
+    def merge_tiles(self, 分块, 分块信息, 羽化比例):
+        """
+        合并分块
+
+        融合权重在两个方向上可分离：每个分块的权重为行权重与列权重的外积，
+        权重总和同样是两个方向总和的外积，逐块对整批帧做加权累加后统一归一化
+        """
+        xs, ys = 分块信息["xs"], 分块信息["ys"]
+        height, width = 分块信息["image_size"]
+        tile_h, tile_w = 分块信息["tile_size"]
+        tile_count = len(xs) * len(ys)
+
+        if 分块.shape[0] % tile_count != 0:
+            raise ValueError(f"分块数量 {分块.shape[0]} 与分块信息不匹配（每帧 {tile_count} 块）")
+        batch = 分块.shape[0] // tile_count
+        out_tile_h, out_tile_w, channels = 分块.shape[1:]
+
+        # 分块经过缩放时，画布尺寸和分块坐标按相同倍数缩放
+        scale_h = out_tile_h / tile_h
+        scale_w = out_tile_w / tile_w
+        out_h = max(round(height * scale_h), out_tile_h)
+        out_w = max(round(width * scale_w), out_tile_w)
+        out_xs = _scale_starts(xs, scale_w, out_tile_w, out_w)
+        out_ys = _scale_starts(ys, scale_h, out_tile_h, out_h)
+
+        device = 分块.device
+        compute_dtype = 分块.dtype if 分块.dtype in (torch.float32, torch.float64) else torch.float32
+        weights_x = _feather_weights(out_xs, out_tile_w, 羽化比例).to(device, compute_dtype)
+        weights_y = _feather_weights(out_ys, out_tile_h, 羽化比例).to(device, compute_dtype)
+
+        # 各方向的权重总和
+        total_x = torch.zeros(out_w, device=device, dtype=compute_dtype)
+        total_y = torch.zeros(out_h, device=device, dtype=compute_dtype)
+        for i, x in enumerate(out_xs):
+            total_x[x:x + out_tile_w] += weights_x[i]
+        for j, y in enumerate(out_ys):
+            total_y[y:y + out_tile_h] += weights_y[j]
+
+        tiles = 分块.reshape(batch, tile_count, out_tile_h, out_tile_w, channels)
+        canvas = torch.zeros((batch, out_h, out_w, channels), device=device, dtype=compute_dtype)
+        for j, y in enumerate(out_ys):
+            for i, x in enumerate(out_xs):
+                weight = torch.outer(weights_y[j], weights_x[i]).unsqueeze(-1)
+                region = canvas[:, y:y + out_tile_h, x:x + out_tile_w]
+                region.addcmul_(tiles[:, j * len(out_xs) + i].to(compute_dtype), weight)
+
+        total = torch.outer(total_y, total_x).clamp_(min=1e-8).unsqueeze(-1)
+        canvas.div_(total)
+
+        print(f"[图像分块] 合并 {tile_count} 个分块为 {out_w}x{out_h} 图像，共 {batch} 帧")
+        return (canvas.to(分块.dtype),)
+
+
+# 节点类映射
+NODE_CLASS_MAPPINGS = {
+    "DD-ImageTileSplitter": DDImageTileSplitter,
+    "DD-ImageTileMerger": DDImageTileMerger,
+}
+
+# 节点显示名称映射
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "DD-ImageTileSplitter": "DD Image Tile Splitter",
+    "DD-ImageTileMerger": "DD Image Tile Merger",
+}
@@ -25,8 +25,9 @@ class ImageToVideo:
                     "min": 1,
                     "max": 120,
                     "step": 1,
-                    "description": "每批处理的帧数，较小的值会降低内存使用"
-                })
+                    "description": "保留以兼容旧工作流，帧数据一次性写入，不再分批"
+                }),
+                "帧存储": (["独立副本", "共享视图"], {"default": "独立副本"}),
             }
         }
     
@@ -35,47 +36,42 @@ class ImageToVideo:
     FUNCTION = "create_video_frames"
     CATEGORY = "🍺DD系列节点"
 
-    def log_progress(self, current, total):
-        """输出进度信息"""
-        percentage = (current / total) * 100
-        print(f"生成进度: {current}/{total} 帧 ({percentage:.1f}%)")
+    def create_video_frames(self, 图片, 时长, 帧率, 批处理大小, 帧存储="独立副本"):
+        """
+        将图片重复为视频帧序列
 
-    def create_video_frames(self, 图片, 时长, 帧率, 批处理大小):
+        共享视图模式下单张图片通过expand()广播为所有帧，所有帧共享同一份数据，
+        内存只占一帧；下游若需原地修改帧，应选择独立副本模式。
+        独立副本模式预先分配输出，通过一次广播赋值写入全部帧。
+        多张图片按整组重复，无法表示为单个视图，始终生成独立副本。
+        """
         try:
             # 计算需要的总帧数（四舍五入处理）
             total_frames = int(round(时长 * 帧率))
             actual_duration = total_frames / 帧率  # 实际时长（考虑帧数取整）
             
-            # 初始化进度
-            frames_processed = 0
-            
             # 确保输入图片格式正确
             if isinstance(图片, torch.Tensor):
                 if 图片.ndim == 3:
                     图片 = 图片.unsqueeze(0)
             
-            # 使用批处理方式生成帧
-            batches = []
-            while frames_processed < total_frames:
-                # 计算当前批次应处理的帧数
-                current_batch_size = min(批处理大小, total_frames - frames_processed)
-                
-                # 为当前批次生成帧
-                batch_frames = 图片.repeat(current_batch_size, 1, 1, 1)
-                batches.append(batch_frames)
-                
-                # 更新进度
-                frames_processed += current_batch_size
-                self.log_progress(frames_processed, total_frames)
+            group_size = 图片.shape[0]
+            frame_shape = tuple(图片.shape[1:])
             
-            # 合并所有批次
-            video_frames = torch.cat(batches, dim=0)
+            if 帧存储 == "共享视图" and group_size == 1:
+                # 步长为0的广播视图，不复制数据
+                video_frames = 图片.expand((total_frames,) + frame_shape)
+            else:
+                # 预分配输出，整组图片广播写入所有重复位置
+                video_frames = 图片.new_empty((total_frames * group_size,) + frame_shape)
+                video_frames.view((total_frames, group_size) + frame_shape)[:] = 图片
             
             print(f"\n视频帧生成完成:")
             print(f"- 总帧数: {total_frames}")
             print(f"- 实际时长: {actual_duration:.3f} 秒")
             print(f"- 帧率: {帧率:.2f} FPS")
-            print(f"- 帧尺寸: {video_frames.shape[-2]}x{video_frames.shape[-1]}")
+            print(f"- 帧尺寸: {video_frames.shape[2]}x{video_frames.shape[1]}")
+            print(f"- 帧存储: {'共享视图' if video_frames.stride(0) == 0 else '独立副本'}")
             
             return (video_frames, total_frames, actual_duration, 帧率)
             
@@ -83,10 +79,136 @@ class ImageToVideo:
             print(f"错误: 生成视频帧时发生异常 - {str(e)}")
             raise e
 
+class ImageSequenceToVideo:
+    """
+    DD 图片序列转视频
+    将一组图片按各自的显示时长排列为视频帧，相邻图片之间按过渡时长交叉淡化
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "图片": ("IMAGE",),
+                "帧率": ("FLOAT", {
+                    "default": 30.0,
+                    "min": 1.0,
+                    "max": 120.0,
+                    "step": 0.1,
+                    "display": "slider"
+                }),
+                "每张时长": ("STRING", {
+                    "default": "2.0",
+                    "multiline": False,
+                    "description": "每张图片的静止显示秒数，用逗号分隔，数量不足时沿用最后一个值"
+                }),
+                "过渡时长": ("STRING", {
+                    "default": "0.5",
+                    "multiline": False,
+                    "description": "相邻图片之间的淡化秒数，用逗号分隔，数量不足时沿用最后一个值"
+                }),
+                "过渡曲线": (["线性", "平滑"], {"default": "线性"}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "INT", "FLOAT", "FLOAT")
+    RETURN_NAMES = ("视频帧", "总帧数", "实际时长", "帧率")
+    FUNCTION = "create_sequence_frames"
+    CATEGORY = "🍺DD系列节点"
+
+    def parse_durations(self, text, count, label):
+        """解析逗号分隔的秒数列表，补齐或截断到count个"""
+        if count == 0:
+            return []
+        parts = [p for p in text.replace("，", ",").replace(" ", ",").split(",") if p]
+        try:
+            values = [max(float(p), 0.0) for p in parts]
+        except ValueError:
+            raise ValueError(f"{label}格式错误: '{text}'，应为逗号分隔的秒数，如 '2, 3, 1.5'")
+        if not values:
+            raise ValueError(f"{label}不能为空")
+        return (values + [values[-1]] * count)[:count]
+
+    def plan_sequence(self, holds, transitions, 帧率):
+        """
+        规划时间轴
+
+        时间轴依次为：图片0静止、0到1过渡、图片1静止……，按累计秒数取整得到每段的帧边界，
+        避免逐段取整产生的累计误差。
+
+        Returns:
+            [(起始帧, 结束帧, 图片索引, 下一张索引或None)] 以及总帧数
+        """
+        segments = []
+        for i, hold in enumerate(holds):
+            segments.append((hold, i, None))
+            if i < len(transitions):
+                segments.append((transitions[i], i, i + 1))
+
+        plan = []
+        elapsed = 0.0
+        start = 0
+        for seconds, index, next_index in segments:
+            elapsed += seconds
+            end = int(round(elapsed * 帧率))
+            if end > start:
+                plan.append((start, end, index, next_index))
+            start = end
+        return plan, start
+
+    def create_sequence_frames(self, 图片, 帧率, 每张时长, 过渡时长, 过渡曲线="线性"):
+        """
+        生成图片序列视频帧
+
+        输出预先分配，静止段通过广播赋值写入；过渡段整段一次计算：
+        先写入前一张图片，再以每帧的权重向量与后一张图片原地lerp_，不生成中间张量
+        """
+        try:
+            if 图片.ndim == 3:
+                图片 = 图片.unsqueeze(0)
+
+            count = 图片.shape[0]
+            holds = self.parse_durations(每张时长, count, "每张时长")
+            transitions = self.parse_durations(过渡时长, count - 1, "过渡时长")
+            plan, total_frames = self.plan_sequence(holds, transitions, 帧率)
+            if total_frames == 0:
+                raise ValueError("总时长过短，没有生成任何帧")
+
+            video_frames = 图片.new_empty((total_frames,) + tuple(图片.shape[1:]))
+            for start, end, index, next_index in plan:
+                segment = video_frames[start:end]
+                segment[:] = 图片[index]
+                if next_index is None:
+                    continue
+
+                # 过渡权重取(k+1)/(n+1)，不与两端的静止帧重复
+                length = end - start
+                weights = torch.arange(1, length + 1, device=图片.device, dtype=torch.float32) / (length + 1)
+                if 过渡曲线 == "平滑":
+                    weights = weights * weights * (3 - 2 * weights)
+                weights = weights.to(图片.dtype).view(-1, 1, 1, 1)
+                segment.lerp_(图片[next_index].expand_as(segment), weights)
+
+            actual_duration = total_frames / 帧率
+
+            print("\n图片序列视频帧生成完成:")
+            print(f"- 图片数量: {count}")
+            print(f"- 总帧数: {total_frames}")
+            print(f"- 实际时长: {actual_duration:.3f} 秒")
+            print(f"- 帧率: {帧率:.2f} FPS")
+
+            return (video_frames, total_frames, actual_duration, 帧率)
+
+        except Exception as e:
+            print(f"错误: 生成图片序列视频帧时发生异常 - {str(e)}")
+            raise e
+
 NODE_CLASS_MAPPINGS = {
-    "DD-ImageToVideo": ImageToVideo
+    "DD-ImageToVideo": ImageToVideo,
+    "DD-ImageSequenceToVideo": ImageSequenceToVideo
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "DD-ImageToVideo": "DD Image To Video"
+    "DD-ImageToVideo": "DD Image To Video",
+    "DD-ImageSequenceToVideo": "DD Image Sequence To Video"
 }
@@ -2,6 +2,7 @@ import torch
 import numpy as np
 import cv2
 import comfy.utils
+from .resize_utils import resize_bchw
 from typing import List, Dict, Any, Tuple
 
 class DDMaskUniformSize:
@@ -48,8 +49,24 @@ class DDMaskUniformSize:
         "lanczos": cv2.INTER_LANCZOS4
     }
 
-    def _resize_batch(self, mask_batch, target_size, interpolation_mode, size_adapt):
-        """调整一批遮罩的大小"""
+    def _to_b1hw(self, mask):
+        """将[H,W]、[B,H,W]或[B,1,H,W]遮罩统一为[B,1,H,W]视图"""
+        if len(mask.shape) == 2:  # 单个遮罩 [H, W]
+            return mask.view(1, 1, *mask.shape)
+        if len(mask.shape) == 3:  # [B, H, W]
+            return mask.unsqueeze(1)
+        return mask
+
+    def _resize_batch(self, mask_batch, target_size, interpolation_mode, size_adapt, out=None):
+        """
+        调整一批遮罩的大小
+
+        Args:
+            mask_batch: [B,1,H,W]遮罩
+            out: 可选的[B,1,H,W]输出缓冲区，未提供时新建
+        Returns:
+            [B,1,H,W]调整后的遮罩
+        """
         if mask_batch is None:
             return None
             
@@ -57,9 +74,7 @@ class DDMaskUniformSize:
         if not isinstance(mask_batch, torch.Tensor):
             return None
         
-        # 遮罩格式处理：确保是批次形式[B,H,W]
-        if len(mask_batch.shape) == 2:  # 单个遮罩 [H, W]
-            mask_batch = mask_batch.unsqueeze(0)  # [1, H, W]
+        mask_batch = self._to_b1hw(mask_batch)
         
         # 获取插值方法
         interpolation = self.INTERPOLATION_MAP.get(interpolation_mode, cv2.INTER_NEAREST_EXACT)
@@ -67,73 +82,54 @@ class DDMaskUniformSize:
         # 根据尺寸适配方法调整遮罩
         if size_adapt == "拉伸":
             # 直接调整到目标尺寸
-            result = self._batch_resize(mask_batch, target_size, interpolation)
+            return self._batch_resize(mask_batch, target_size, interpolation, out)
         
         elif size_adapt == "自适应":
             # 保持宽高比缩放
-            result = self._batch_adaptive_resize(mask_batch, target_size, interpolation)
+            return self._batch_adaptive_resize(mask_batch, target_size, interpolation, out)
             
         elif size_adapt == "裁剪":
             # 保持宽高比缩放后居中裁剪
-            result = self._batch_center_crop(mask_batch, target_size, interpolation)
+            return self._batch_center_crop(mask_batch, target_size, interpolation, out)
             
         elif size_adapt == "填充":
             # 保持宽高比缩放后填充
-            result = self._batch_pad(mask_batch, target_size, interpolation)
+            return self._batch_pad(mask_batch, target_size, interpolation, out)
             
-        else:
-            # 默认使用自适应
-            result = self._batch_adaptive_resize(mask_batch, target_size, interpolation)
-        
-        return result
+        # 默认使用自适应
+        return self._batch_adaptive_resize(mask_batch, target_size, interpolation, out)
 
-    def _batch_resize(self, batch, target_size, interpolation):
-        """批量调整尺寸 - 直接拉伸"""
+    def _new_output(self, batch, target_size, out):
+        """返回[B,1,H,W]输出缓冲区"""
+        if out is not None:
+            return out
         target_height, target_width = target_size
-        # 将遮罩从[B,H,W]转换为[B,1,H,W]用于插值
-        batch_b1hw = batch.unsqueeze(1) if len(batch.shape) == 3 else batch
-        
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(target_height, target_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(target_height, target_width),
-                mode=torch_mode
-            )
-        
-        # 移除额外的维度，返回[B,H,W]
-        return resized.squeeze(1) if len(batch.shape) == 3 else resized
+        return torch.empty((batch.shape[0], 1, target_height, target_width), dtype=batch.dtype, device=batch.device)
 
-    def _get_torch_mode(self, cv2_interpolation):
-        """将OpenCV插值模式转换为PyTorch模式"""
+    def _batch_resize(self, batch, target_size, interpolation, out=None):
+        """批量调整尺寸 - 直接拉伸"""
+        out = self._new_output(batch, target_size, out)
+        out.copy_(resize_bchw(batch, tuple(target_size), self._get_resize_method(interpolation)))
+        return out
+
+    def _get_resize_method(self, cv2_interpolation):
+        """将OpenCV插值模式转换为缩放引擎的方法名"""
         if cv2_interpolation in [cv2.INTER_NEAREST, cv2.INTER_NEAREST_EXACT]:
-            return 'nearest'
+            return 'nearest-exact'
         elif cv2_interpolation == cv2.INTER_LINEAR:
             return 'bilinear'
         elif cv2_interpolation == cv2.INTER_CUBIC:
             return 'bicubic'
         elif cv2_interpolation == cv2.INTER_AREA:
             return 'area'
+        elif cv2_interpolation == cv2.INTER_LANCZOS4:
+            return 'lanczos'
         else:
-            return 'nearest'  # 遮罩默认返回最邻近
+            return 'nearest-exact'  # 遮罩默认返回最邻近
 
-    def _batch_adaptive_resize(self, batch, target_size, interpolation):
+    def _batch_adaptive_resize(self, batch, target_size, interpolation, out=None):
         """批量自适应调整尺寸 - 保持宽高比"""
-        # 获取尺寸信息
-        if len(batch.shape) == 3:  # [B,H,W]
-            batch_size, height, width = batch.shape
-        elif len(batch.shape) == 4:  # [B,1,H,W]
-            batch_size, _, height, width = batch.shape
-        
+        batch_size, _, height, width = batch.shape
         target_height, target_width = target_size
         
         # 计算缩放比例
@@ -142,56 +138,24 @@ class DDMaskUniformSize:
         new_height = int(height * ratio)
         
         # 先调整大小
-        if len(batch.shape) == 3:
-            batch_b1hw = batch.unsqueeze(1)
-        else:
-            batch_b1hw = batch
-        
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(new_height, new_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(new_height, new_width),
-                mode=torch_mode
-            )
-        
-        # 创建目标大小的空张量
-        if len(batch.shape) == 3:
-            result = torch.zeros(batch_size, target_height, target_width, device=batch.device)
-        else:
-            result = torch.zeros(batch_size, 1, target_height, target_width, device=batch.device)
+        resized = resize_bchw(batch, (new_height, new_width), self._get_resize_method(interpolation))
         
         # 计算偏移量
         y_offset = (target_height - new_height) // 2
         x_offset = (target_width - new_width) // 2
         
-        # 将调整后的遮罩放在中心
-        if len(batch.shape) == 3:
-            result[:, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized.squeeze(1)
-        else:
-            result[:, :, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized
-        
-        return result.squeeze(1) if len(batch.shape) == 3 else result
+        # 四周留白置零，调整后的遮罩放在中心
+        out = self._new_output(batch, target_size, out)
+        out[:, :, :y_offset].zero_()
+        out[:, :, y_offset + new_height:].zero_()
+        out[:, :, y_offset:y_offset + new_height, :x_offset].zero_()
+        out[:, :, y_offset:y_offset + new_height, x_offset + new_width:].zero_()
+        out[:, :, y_offset:y_offset + new_height, x_offset:x_offset + new_width] = resized
+        return out
 
-    def _batch_center_crop(self, batch, target_size, interpolation):
+    def _batch_center_crop(self, batch, target_size, interpolation, out=None):
         """批量中心裁剪 - 先调整大小然后裁剪"""
-        # 获取尺寸信息
-        if len(batch.shape) == 3:  # [B,H,W]
-            batch_size, height, width = batch.shape
-            batch_b1hw = batch.unsqueeze(1)
-        elif len(batch.shape) == 4:  # [B,1,H,W]
-            batch_size, _, height, width = batch.shape
-            batch_b1hw = batch
-            
+        batch_size, _, height, width = batch.shape
         target_height, target_width = target_size
         
         # 计算缩放比例 - 以较大的比例为准，确保裁剪
@@ -200,43 +164,85 @@ class DDMaskUniformSize:
         new_height = int(height * ratio)
         
         # 调整大小
-        torch_mode = self._get_torch_mode(interpolation)
-        # 只在适当的模式下使用align_corners参数
-        if torch_mode in ['bilinear', 'bicubic']:
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(new_height, new_width),
-                mode=torch_mode,
-                align_corners=False
-            )
-        else:
-            # 对于'nearest'和'area'模式不使用align_corners参数
-            resized = torch.nn.functional.interpolate(
-                batch_b1hw,
-                size=(new_height, new_width),
-                mode=torch_mode
-            )
+        resized = resize_bchw(batch, (new_height, new_width), self._get_resize_method(interpolation))
         
         # 计算裁剪区域
         y_start = (new_height - target_height) // 2
         x_start = (new_width - target_width) // 2
         
         # 裁剪中心区域
-        cropped = resized[:, :, y_start:y_start + target_height, x_start:x_start + target_width]
-        
-        # 返回正确的维度
-        return cropped.squeeze(1) if len(batch.shape) == 3 else cropped
+        out = self._new_output(batch, target_size, out)
+        out.copy_(resized[:, :, y_start:y_start + target_height, x_start:x_start + target_width])
+        return out
 
-    def _batch_pad(self, batch, target_size, interpolation):
+    def _batch_pad(self, batch, target_size, interpolation, out=None):
         """批量填充 - 保持宽高比并填充"""
         # 这与自适应调整相同，因为我们已经创建了全零背景并居中放置调整后的遮罩
-        return self._batch_adaptive_resize(batch, target_size, interpolation)
+        return self._batch_adaptive_resize(batch, target_size, interpolation, out)
 
     def _apply_threshold(self, mask, threshold_value):
         """应用阈值处理"""
         return (mask > threshold_value).float()
 
-    def resize_masks(self, 缩放方法, 宽度, 高度, 尺寸适配, 阈值处理, 阈值值, 
+    def _group_inputs(self, valid_inputs):
+        """按尺寸、数据类型和设备对输入分组，同一张量只参与一次计算
+
+        Returns:
+            {分组键: [(输入名称, [B,1,H,W]遮罩), ...]}，保持输入顺序
+        """
+        groups = {}
+        seen = []
+        for name, mask in valid_inputs.items():
+            if any(mask is other for other in seen):
+                continue
+            seen.append(mask)
+            mask = self._to_b1hw(mask)
+            key = (tuple(mask.shape[-2:]), mask.dtype, mask.device)
+            groups.setdefault(key, []).append((name, mask))
+        return groups
+
+    def _resize_group(self, batches, target_size, 缩放方法, 尺寸适配, 阈值处理, 阈值值):
+        """
+        缩放一组相同尺寸的遮罩，所有输入写入同一个输出缓冲区
+
+        已是目标尺寸的遮罩不做插值；启用阈值处理时缩放与二值化合并进行：
+        最邻近缩放与阈值处理可以交换顺序，放大时先在原分辨率二值化为uint8再缩放，
+        其他情况先缩放，再直接在输出缓冲区上原地二值化。
+        uint8只在节点内部使用，输出始终为float32
+
+        Returns:
+            与batches一一对应的[B,1,H,W]结果列表
+        """
+        height, width = batches[0].shape[-2:]
+        target_height, target_width = target_size
+
+        if (height, width) == (target_height, target_width):
+            # 已是目标尺寸：各适配方式的结果都等于原遮罩
+            if not 阈值处理:
+                return batches
+            return [self._apply_threshold(batch, 阈值值) for batch in batches]
+
+        interpolation = self.INTERPOLATION_MAP.get(缩放方法, cv2.INTER_NEAREST_EXACT)
+        threshold_first = (阈值处理 and self._get_resize_method(interpolation) == 'nearest-exact'
+                           and height * width <= target_height * target_width)
+        if threshold_first:
+            batches = [torch.gt(batch, 阈值值).view(torch.uint8) for batch in batches]
+
+        buffer = torch.empty((sum(batch.shape[0] for batch in batches), 1, target_height, target_width),
+                             dtype=batches[0].dtype, device=batches[0].device)
+        start = 0
+        for batch in batches:
+            end = start + batch.shape[0]
+            self._resize_batch(batch, target_size, 缩放方法, 尺寸适配, out=buffer[start:end])
+            start = end
+
+        if threshold_first:
+            buffer = buffer.float()
+        elif 阈值处理:
+            buffer = buffer.gt_(阈值值)
+        return torch.split(buffer, [batch.shape[0] for batch in batches], dim=0)
+
+    def resize_masks(self, 缩放方法, 宽度, 高度, 尺寸适配, 阈值处理, 阈值值,
                      遮罩A=None, 遮罩B=None, 遮罩C=None, 遮罩D=None):
         """根据指定参数统一调整所有输入遮罩的大小"""
         target_size = (高度, 宽度)  # (H, W)
@@ -265,16 +271,18 @@ class DDMaskUniformSize:
             empty_mask = torch.zeros(1, 高度, 宽度)
             return (empty_mask,)
         
-        # 处理每个有效输入
-        for mask in valid_inputs.values():
-            # 调整遮罩大小
-            resized = self._resize_batch(mask, target_size, 缩放方法, 尺寸适配)
-            
-            # 如果启用了阈值处理
-            if 阈值处理:
-                resized = self._apply_threshold(resized, 阈值值)
-                
-            results.append(resized)
+        # 相同尺寸的输入共用一个输出缓冲区，按原批次拆分为[B,H,W]视图
+        resized_map = {}
+        for members in self._group_inputs(valid_inputs).values():
+            batches = [mask for _, mask in members]
+            resized_list = self._resize_group(batches, target_size, 缩放方法, 尺寸适配, 阈值处理, 阈值值)
+            for (name, _), resized in zip(members, resized_list):
+                resized_map[name] = resized.squeeze(1)
+
+        for name, mask in valid_inputs.items():
+            # 同一个张量接入多个端口时直接复用结果
+            source = next(other for other, other_mask in valid_inputs.items() if other_mask is mask)
+            results.append(resized_map[source])
             
         return tuple(results)
 
@@ -3,12 +3,172 @@ import folder_paths
 import comfy.sd
 import comfy.utils
 import comfy.model_management as model_management
+import os
 import sys
 import gc
+import json
+import mmap
+import struct
+import threading
+import weakref
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import psutil
 from datetime import datetime
 import time
 from pathlib import Path
+from collections import OrderedDict
+from safetensors.torch import save_file
+
+# safetensors文件头中的数据类型名称
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "F8_E4M3": torch.float8_e4m3fn,
+    "F8_E5M2": torch.float8_e5m2,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+class LoadedModelCache:
+    """
+    进程内已加载模型的LRU缓存
+    相同文件和精度设置的重复加载直接复用已构建的模型，超出容量上限时淘汰最久未使用、
+    且没有被其他节点引用的模型
+    """
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (模型, 大小)
+        self._users = {}  # key -> 已交出且仍存活的副本
+
+    @staticmethod
+    def _share(model):
+        """ModelPatcher的克隆共享同一个底层模型"""
+        return model.clone() if hasattr(model, "clone") else model
+
+    def _hand_out(self, key, model):
+        """交出模型副本，并登记该副本，副本被释放前对应的条目视为正在使用"""
+        shared = self._share(model)
+        if shared is not model:
+            self._users.setdefault(key, weakref.WeakSet()).add(shared)
+        return shared
+
+    def in_use(self, key):
+        return len(self._users.get(key, ())) > 0
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, size in self._entries.values())
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._hand_out(key, entry[0])
+
+    def put(self, key, model):
+        """缓存模型并返回交给调用方使用的副本"""
+        size = model.model_size() if hasattr(model, "model_size") else 0
+        if size > self.max_bytes:
+            return model
+        self._entries.pop(key, None)
+        self._entries[key] = (model, size)
+        # 先交出副本再淘汰，新模型此时已被引用，不会被立即淘汰
+        shared = self._hand_out(key, model)
+        self.evict()
+        return shared
+
+    def evict(self):
+        """按最久未使用顺序淘汰未被引用的模型，直到总大小不超过上限"""
+        total = self.total_bytes
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if self.in_use(key):
+                continue
+            total -= self._entries.pop(key)[1]
+            self._users.pop(key, None)
+            self.evictions += 1
+
+    def set_max_bytes(self, max_bytes):
+        """设置容量上限并立即淘汰到上限以内，调小上限后无需重启即可生效"""
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+        }
+
+
+# 进程内共享的模型缓存，容量由最近一次开启缓存的节点设置，默认为0即不缓存
+MODEL_CACHE = LoadedModelCache()
+
+class LoadTelemetry:
+    """
+    分阶段记录模型加载的耗时、处理字节数、吞吐量以及阶段内的内存/显存峰值
+    阶段内由后台线程定时采样进程内存，显存峰值使用torch的峰值统计
+    """
+
+    SAMPLE_INTERVAL = 0.02  # 秒
+
+    def __init__(self):
+        self.process = psutil.Process()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name, nbytes=0):
+        """记录一个阶段，可在阶段内修改返回字典的bytes字段"""
+        record = {"phase": name, "bytes": nbytes}
+        peak_rss = [self.process.memory_info().rss]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.SAMPLE_INTERVAL):
+                peak_rss[0] = max(peak_rss[0], self.process.memory_info().rss)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stop.set()
+            sampler.join()
+            peak_rss[0] = max(peak_rss[0], self.process.memory_info().rss)
+            record["seconds"] = round(elapsed, 4)
+            record["gb_per_s"] = round(record["bytes"] / (1024**3) / elapsed, 3) if record["bytes"] and elapsed > 0 else 0.0
+            record["peak_rss_gb"] = round(peak_rss[0] / (1024**3), 3)
+            record["peak_vram_gb"] = (round(torch.cuda.max_memory_allocated() / (1024**3), 3)
+                                      if torch.cuda.is_available() else None)
+            self.phases.append(record)
+
+    def to_json(self, **fields):
+        """生成单行JSON记录"""
+        fields["phases"] = self.phases
+        return json.dumps(fields, ensure_ascii=False)
+
 
 class DDModelOptimizer:
     @classmethod
@@ -27,16 +187,47 @@ class DDModelOptimizer:
                     "FP8高速性能优化",      # fp8_e4m3fn_fast
                     "FP8稳定质量优化"       # fp8_e5m2
                 ],),
+                "权重缓存": ("BOOLEAN", {"default": False}),
+                "权重缓存上限": ("FLOAT", {"default": 64.0, "min": 1.0, "max": 4096.0, "step": 1.0}),
+                "转换线程数": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                "模型缓存上限": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1024.0, "step": 0.5}),
             }
         }
     
-    RETURN_TYPES = ("MODEL",)
-    RETURN_NAMES = ("优化模型",)
+    RETURN_TYPES = ("MODEL", "STRING")
+    RETURN_NAMES = ("优化模型", "加载统计")
     FUNCTION = "optimize_model"
     CATEGORY = "🍺DD系列节点"
 
+    # FP8权重缓存目录
+    FP8_CACHE_DIR = os.path.join(folder_paths.models_dir, "dd_fp8_cache")
+
+    # 并行转换：每个任务处理的张量字节数，以及自动模式下的最大线程数
+    CONVERT_CHUNK_BYTES = 64 * 1024**2
+    MAX_AUTO_CONVERT_WORKERS = 16
+
+    # 智能模式：各优化模式的目标精度和画质等级（数值越小画质越好）
+    OPTIMIZE_MODE_DTYPES = {
+        "禁用优化": None,
+        "FP8稳定质量优化": torch.float8_e5m2,
+        "FP8基础内存优化": torch.float8_e4m3fn,
+        "FP8高速性能优化": torch.float8_e4m3fn,
+    }
+    SMART_QUALITY_RANK = {
+        "禁用优化": 0,
+        "FP8稳定质量优化": 1,
+        "FP8基础内存优化": 2,
+        "FP8高速性能优化": 3,
+    }
+    # 可用内存/显存中留给其他用途的余量，以及显存不足时允许部分卸载到内存的倍数
+    SMART_HOST_HEADROOM = 0.9
+    SMART_VRAM_OFFLOAD_FACTOR = 1.5
+    # 估算加载时间用的读取和转换速度（GB/s）
+    SMART_READ_GBPS = 1.5
+    SMART_CONVERT_GBPS = 2.0
+
     def get_system_info(self):
-        """获取系统配置信息"""
+        """获取系统配置信息，可用内存和显存均为当前实测值"""
         system_info = {
             "total_memory": psutil.virtual_memory().total / (1024**3),  # GB
             "available_memory": psutil.virtual_memory().available / (1024**3),  # GB
@@ -45,81 +236,125 @@ class DDModelOptimizer:
         }
         
         if torch.cuda.is_available():
+            free_memory, total_memory = torch.cuda.mem_get_info(0)
             system_info["gpu_info"] = {
                 "name": torch.cuda.get_device_name(),
-                "total_memory": torch.cuda.get_device_properties(0).total_memory / (1024**3),  # GB
-                "free_memory": torch.cuda.memory_allocated(0) / (1024**3),  # GB
+                "total_memory": total_memory / (1024**3),  # GB
+                "free_memory": free_memory / (1024**3),  # GB
             }
         return system_info
 
-    def determine_smart_options(self, system_info, model_path):
-        """根据系统配置和模型智能确定最佳选项
+    def estimate_model_footprint(self, model_path):
+        """不加载模型，根据safetensors文件头估算权重大小
+
+        Returns:
+            字典：source_bytes（文件中权重字节数）、float_bytes（浮点权重字节数）、
+            float_count（浮点参数个数）、max_tensor_bytes（最大单个张量字节数）、
+            streamable（是否可流式读取）
+        """
+        if model_path.lower().endswith((".safetensors", ".sft")):
+            header, _ = self.read_safetensors_header(model_path)
+            footprint = {"source_bytes": 0, "float_bytes": 0, "float_count": 0,
+                         "max_tensor_bytes": 0, "streamable": self.can_stream(header)}
+            for info in header.values():
+                nbytes = info["data_offsets"][1] - info["data_offsets"][0]
+                dtype = SAFETENSORS_DTYPES.get(info["dtype"])
+                footprint["source_bytes"] += nbytes
+                footprint["max_tensor_bytes"] = max(footprint["max_tensor_bytes"], nbytes)
+                # 未知数据类型按非浮点权重计算，不参与精度转换
+                if dtype is not None and dtype.is_floating_point:
+                    footprint["float_bytes"] += nbytes
+                    footprint["float_count"] += nbytes // torch.empty((), dtype=dtype).element_size()
+            return footprint
+
+        # 其他格式无法读取文件头，按文件大小估算，并假定为半精度权重
+        size = os.path.getsize(model_path)
+        return {"source_bytes": size, "float_bytes": size, "float_count": size // 2,
+                "max_tensor_bytes": size, "streamable": False}
+
+    def plan_load_candidate(self, footprint, 加载模式, 优化模式, workers):
+        """估算某种加载组合的权重大小、加载峰值内存（字节）和加载时间（秒）"""
+        dtype = self.OPTIMIZE_MODE_DTYPES[优化模式]
+        source = footprint["source_bytes"]
+        if dtype is None:
+            weights = source
+        else:
+            weights = (source - footprint["float_bytes"]
+                       + footprint["float_count"] * torch.empty((), dtype=dtype).element_size())
+        convert_bytes = footprint["float_bytes"] if dtype is not None else 0
+
+        read_time = source / (self.SMART_READ_GBPS * 1024**3)
+        convert_time = convert_bytes / (self.SMART_CONVERT_GBPS * 1024**3)
+
+        if 加载模式 == "分步加载" and footprint["streamable"]:
+            # 流式读取：同时驻留的只有转换结果和各线程正在处理的源张量
+            in_flight = min(source, footprint["max_tensor_bytes"] * workers)
+            peak = weights + in_flight if dtype is not None else weights
+            load_time = read_time + convert_time / workers
+        elif 加载模式 == "分步加载":
+            peak = source + weights if dtype is not None else source
+            load_time = read_time + convert_time / workers
+        else:
+            peak = source + weights if dtype is not None else source
+            load_time = read_time + convert_time
+
+        return {"加载模式": 加载模式, "优化模式": 优化模式, "weights": weights,
+                "peak": peak, "load_time": load_time}
+
+    def determine_smart_options(self, system_info, model_path, workers=1):
+        """根据实测可用内存/显存和模型大小选择加载方案
+
+        先按画质等级（不优化优先于FP8）找出能放进内存和显存预算的方案，
+        同一等级中选择预计加载时间最短的方案。
         
         Args:
             system_info: 系统信息
             model_path: 模型路径
+            workers: 分步加载的转换线程数
         """
         try:
-            # 将字符串路径转换为Path对象
-            path_obj = Path(model_path)
-            # 安全获取文件大小
-            if path_obj.exists():
-                model_size = path_obj.stat().st_size / (1024**3)  # GB
-                print(f"\n模型文件大小: {model_size:.2f}GB")
-            else:
-                print(f"警告: 模型文件不存在: {model_path}")
-                model_size = 0
-                
+            footprint = self.estimate_model_footprint(model_path)
         except Exception as e:
-            print(f"警告: 无法获取模型文件信息: {str(e)}")
-            model_size = 0
-        
-        options = {
-            "加载模式": "标准加载",
-            "优化模式": "禁用优化"
-        }
-        
-        # 获取显存和内存信息
-        vram = 0
-        ram = system_info["total_memory"]
-        
+            print(f"警告: 无法读取模型文件信息: {str(e)}")
+            return {"加载模式": "标准加载", "优化模式": "禁用优化"}
+
+        gb = 1024**3
+        print(f"\n模型权重大小: {footprint['source_bytes'] / gb:.2f}GB, "
+              f"浮点参数: {footprint['float_count'] / 1e9:.2f}B")
+
+        host_budget = system_info["available_memory"] * self.SMART_HOST_HEADROOM * gb
+        vram_budget = None
+        print(f"系统可用内存: {system_info['available_memory']:.2f}GB")
         if system_info["gpu_info"]:
-            vram = system_info["gpu_info"]["total_memory"]
-            print(f"GPU总显存: {vram:.2f}GB")
-            print(f"系统总内存: {ram:.2f}GB")
-        
-        # 设置缓冲系数
-        vram_scale_factor = 1.5
-        ram_scale_factor = 1.5
-        
-        # 决定加载模式
-        # 如果模型大小大于可用显存的70%或大于显存总量，使用分步加载
-        if model_size > vram * 0.7:
-            options["加载模式"] = "分步加载"
-            print("由于模型大小超过可用显存的70%，选择分步加载模式")
-        
-        # 应用新的优化规则
-        if model_size <= vram:
-            options["优化模式"] = "禁用优化"
-            print("模型完全适配显存，获得最佳质量")
-            
-        elif model_size <= vram * vram_scale_factor and model_size <= ram:
-            options["优化模式"] = "禁用优化"
-            print("模型可通过显存+虚拟内存加载，保持最佳质量")
-            
-        elif model_size > vram * vram_scale_factor and model_size <= ram:
-            options["优化模式"] = "FP8稳定质量优化"
-            print("模型显著超出显存但适配内存，启动质量优先优化")
-            
-        elif model_size > ram and model_size <= ram * ram_scale_factor:
-            options["优化模式"] = "FP8基础内存优化"
-            print("模型超出物理内存，启动内存优化")
-            
-        else:  # model_size > ram * ram_scale_factor
-            options["优化模式"] = "FP8高速性能优化"
-            print("模型严重超出物理内存，启动性能优先优化")
-        
-        return options
+            free_vram = system_info["gpu_info"]["free_memory"]
+            vram_budget = free_vram * self.SMART_HOST_HEADROOM * self.SMART_VRAM_OFFLOAD_FACTOR * gb
+            print(f"GPU可用显存: {free_vram:.2f}GB / {system_info['gpu_info']['total_memory']:.2f}GB")
+
+        candidates = [
+            self.plan_load_candidate(footprint, 加载模式, 优化模式, workers)
+            for 优化模式 in self.OPTIMIZE_MODE_DTYPES
+            for 加载模式 in ("标准加载", "分步加载")
+        ]
+        feasible = [
+            c for c in candidates
+            if c["peak"] <= host_budget and (vram_budget is None or c["weights"] <= vram_budget)
+        ]
+
+        if feasible:
+            best = min(feasible, key=lambda c: (self.SMART_QUALITY_RANK[c["优化模式"]],
+                                                c["load_time"], c["peak"]))
+            print("按画质优先、加载时间最短选择方案")
+        else:
+            best = min(candidates, key=lambda c: (c["peak"], self.SMART_QUALITY_RANK[c["优化模式"]]))
+            print("警告: 没有方案能放入当前可用内存/显存，选择峰值内存最低的方案")
+
+        print(f"预计加载峰值内存: {best['peak'] / gb:.2f}GB (预算 {host_budget / gb:.2f}GB)")
+        if vram_budget is not None:
+            print(f"预计模型显存占用: {best['weights'] / gb:.2f}GB (预算 {vram_budget / gb:.2f}GB)")
+        print(f"预计加载时间: {best['load_time']:.1f}秒")
+
+        return {"加载模式": best["加载模式"], "优化模式": best["优化模式"],
+                "预计峰值内存": best["peak"] / gb}
 
     def show_step_progress(self, step_name, progress=0):
         """显示步骤进度
@@ -135,7 +370,263 @@ class DDModelOptimizer:
         if progress >= 100:
             print()
 
-    def optimize_model(self, 模型文件, 智能模式, 加载模式, 优化模式):
+    def read_safetensors_header(self, model_path):
+        """读取safetensors文件头，不加载任何权重
+
+        Returns:
+            (张量信息字典, 数据区起始偏移)
+        """
+        with open(model_path, "rb") as f:
+            header_size = struct.unpack("<Q", f.read(8))[0]
+            header = json.loads(f.read(header_size))
+        header.pop("__metadata__", None)
+        return header, 8 + header_size
+
+    def can_stream(self, header):
+        """文件中所有张量的数据类型都能识别时才可流式读取，否则交给comfy.utils.load_torch_file"""
+        return all(info["dtype"] in SAFETENSORS_DTYPES for info in header.values())
+
+    def resolve_convert_workers(self, workers):
+        """转换线程数，0表示按CPU核心数自动选择"""
+        if workers and workers > 0:
+            return workers
+        return max(1, min(os.cpu_count() or 1, self.MAX_AUTO_CONVERT_WORKERS))
+
+    def plan_convert_chunks(self, sizes):
+        """按张量大小分组，每组约CONVERT_CHUNK_BYTES，超过该大小的张量单独成组
+
+        大组排在前面优先提交，避免最后只剩一个大张量在单线程上转换
+        """
+        chunks, current, current_bytes = [], [], 0
+        for index, size in enumerate(sizes):
+            if current and current_bytes + size > self.CONVERT_CHUNK_BYTES:
+                chunks.append(current)
+                current, current_bytes = [], 0
+            current.append(index)
+            current_bytes += size
+        if current:
+            chunks.append(current)
+        chunks.sort(key=lambda chunk: -sum(sizes[i] for i in chunk))
+        return chunks
+
+    def convert_parallel(self, keys, sizes, convert_one, workers, step_name, on_progress=None):
+        """
+        用线程池并行转换张量（torch在复制和类型转换时会释放GIL）
+
+        Args:
+            keys: 按原始顺序排列的键
+            sizes: 每个张量的源字节数，用于分组和统计吞吐量
+            convert_one: 接收索引并返回转换结果的函数
+            workers: 线程数
+            step_name: 进度条名称
+            on_progress: 每完成一组后在主线程调用的回调
+        Returns:
+            与keys顺序一致的字典，结果与线程数无关
+        """
+        results = [None] * len(keys)
+        total_bytes = sum(sizes)
+
+        def convert_chunk(chunk):
+            for index in chunk:
+                results[index] = convert_one(index)
+            return sum(sizes[index] for index in chunk)
+
+        start_time = time.time()
+        done_bytes = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_chunk, chunk) for chunk in self.plan_convert_chunks(sizes)]
+            for future in as_completed(futures):
+                done_bytes += future.result()
+                if on_progress is not None:
+                    on_progress()
+                self.show_step_progress(step_name, int(done_bytes / max(total_bytes, 1) * 100))
+        if total_bytes == 0:
+            self.show_step_progress(step_name, 100)
+
+        elapsed = max(time.time() - start_time, 1e-6)
+        total_gb = total_bytes / (1024**3)
+        print(f"{step_name}: {total_gb:.2f}GB, {workers}线程, 用时{elapsed:.2f}秒, "
+              f"吞吐量{total_gb / elapsed:.2f}GB/s")
+        return dict(zip(keys, results))
+
+    def stream_load_state_dict(self, model_path, dtype=None, workers=1):
+        """
+        以内存映射方式读取safetensors张量，读取后立即转换精度并释放原张量
+
+        每个张量直接从映射区转换到目标精度，处理完后通知系统回收对应的映射页，
+        多个线程同时转换不同的张量
+
+        Args:
+            model_path: safetensors模型路径
+            dtype: 目标精度，为None时保持原精度
+            workers: 转换线程数
+        Returns:
+            (state_dict, 峰值内存GB)
+        """
+        header, data_offset = self.read_safetensors_header(model_path)
+        process = psutil.Process()
+        peak_rss = [process.memory_info().rss]
+        can_release = hasattr(mmap, "MADV_DONTNEED")
+
+        keys = list(header.keys())
+        infos = list(header.values())
+        sizes = [info["data_offsets"][1] - info["data_offsets"][0] for info in infos]
+
+        def sample_memory():
+            peak_rss[0] = max(peak_rss[0], process.memory_info().rss)
+
+        with open(model_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as mm:
+            def convert_one(index):
+                info = infos[index]
+                source_dtype = SAFETENSORS_DTYPES[info["dtype"]]
+                start, end = (data_offset + offset for offset in info["data_offsets"])
+                item_size = torch.empty((), dtype=source_dtype).element_size()
+
+                if end == start:
+                    tensor = torch.empty(info["shape"], dtype=source_dtype)
+                elif start % item_size == 0:
+                    tensor = torch.frombuffer(mm, dtype=source_dtype, count=(end - start) // item_size,
+                                              offset=start).view(info["shape"])
+                else:
+                    tensor = torch.frombuffer(bytearray(mm[start:end]), dtype=source_dtype).view(info["shape"])
+
+                if dtype is not None and tensor.is_floating_point():
+                    # 强制复制：目标精度与源精度相同时to()会直接返回映射区上的视图，映射关闭后再访问会崩溃
+                    result = tensor.to(dtype, copy=True)
+                else:
+                    result = tensor.clone()
+                del tensor
+
+                # 释放已处理张量占用的映射页（只读的私有映射，重复释放相邻页也只会触发重新读取）
+                if can_release and end > start:
+                    page_start = start - start % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, page_start, end - page_start)
+                return result
+
+            state_dict = self.convert_parallel(keys, sizes, convert_one, workers,
+                                               "读取并转换权重", on_progress=sample_memory)
+
+        sample_memory()
+        return state_dict, peak_rss[0] / (1024**3)
+
+    def get_fp8_cache_path(self, model_path, dtype):
+        """根据源文件路径、修改时间、大小和目标精度生成缓存文件路径"""
+        stat = os.stat(model_path)
+        key = f"{os.path.abspath(model_path)}|{stat.st_mtime_ns}|{stat.st_size}|{dtype}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.FP8_CACHE_DIR, f"{Path(model_path).stem}-{digest}.safetensors")
+
+    def save_fp8_cache(self, state_dict, cache_path, max_gb=64.0):
+        """写入转换后的权重缓存，并按容量上限(GB)淘汰最久未使用的缓存"""
+        try:
+            os.makedirs(self.FP8_CACHE_DIR, exist_ok=True)
+            temp_path = cache_path + ".tmp"
+            save_file(state_dict, temp_path)
+            os.replace(temp_path, cache_path)
+            print(f"[DD模型优化] FP8权重已写入缓存: {cache_path}")
+        except Exception as e:
+            print(f"[DD模型优化] 警告: 写入FP8权重缓存失败: {str(e)}")
+            if os.path.exists(cache_path + ".tmp"):
+                os.remove(cache_path + ".tmp")
+            return
+
+        self.evict_fp8_cache(max_gb, keep=cache_path)
+
+    def evict_fp8_cache(self, max_gb, keep=None):
+        """缓存总大小超过上限时，按最近使用时间从旧到新删除缓存文件"""
+        entries = []
+        for name in os.listdir(self.FP8_CACHE_DIR):
+            if name.endswith(".safetensors"):
+                path = os.path.join(self.FP8_CACHE_DIR, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        limit = max_gb * (1024**3)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            print(f"[DD模型优化] 已淘汰FP8权重缓存: {os.path.basename(path)}")
+
+    def load_state_dict_stepwise(self, model_path, dtype, workers=1, telemetry=None):
+        """分步加载：读取权重并转换为目标精度
+
+        Returns:
+            (state_dict, 峰值内存GB，未统计时为None)
+        """
+        telemetry = telemetry or LoadTelemetry()
+        file_bytes = os.path.getsize(model_path)
+
+        streamable = False
+        if model_path.lower().endswith((".safetensors", ".sft")):
+            streamable = self.can_stream(self.read_safetensors_header(model_path)[0])
+            if not streamable:
+                print("文件包含无法识别的数据类型，改用常规方式加载")
+
+        if streamable:
+            # 第一、二步合并：流式读取，每个张量读取后立即转换精度
+            print("步骤1: 流式加载模型文件")
+            with telemetry.phase("read_convert", file_bytes):
+                state_dict, peak_memory = self.stream_load_state_dict(model_path, dtype, workers)
+            print("\n步骤2: 预处理权重（已在读取时逐个完成）")
+            return state_dict, peak_memory
+
+        # 第一步：加载模型文件
+        print("步骤1: 加载模型文件")
+        with telemetry.phase("read", file_bytes):
+            self.show_step_progress("加载文件", 0)
+            state_dict = comfy.utils.load_torch_file(model_path)
+            self.show_step_progress("加载文件", 100)
+
+        # 第二步：预处理权重
+        print("\n步骤2: 预处理权重")
+        with telemetry.phase("convert") as record:
+            record["bytes"] = self.convert_state_dict(state_dict, dtype, workers)
+        return state_dict, None
+
+    def convert_state_dict(self, state_dict, dtype, workers=1):
+        """将已加载的state_dict并行转换为目标精度，保持原有键顺序
+
+        与流式读取一致，只转换浮点张量，整数索引等其他张量保持原样
+
+        Returns:
+            转换的源数据字节数
+        """
+        if dtype is None:  # 只在需要优化时进行处理
+            self.show_step_progress("处理权重", 100)
+            return 0
+
+        keys = list(state_dict.keys())
+        values = [state_dict[key] for key in keys]
+        convertible = [torch.is_tensor(value) and value.is_floating_point() for value in values]
+        sizes = [value.numel() * value.element_size() if convert else 0
+                 for value, convert in zip(values, convertible)]
+
+        def convert_one(index):
+            value = values[index]
+            return value.to(dtype) if convertible[index] else value
+
+        state_dict.update(self.convert_parallel(keys, sizes, convert_one, workers, "处理权重"))
+        return sum(sizes)
+
+    def emit_telemetry(self, telemetry, 模型文件, 加载模式, 优化模式, cache_status, duration):
+        """输出单行JSON加载统计，便于跨模型、跨机器比较加载性能"""
+        record = telemetry.to_json(model=模型文件, load_mode=加载模式, optimize_mode=优化模式,
+                                   cache=cache_status, total_seconds=round(duration, 4))
+        print(f"[DD模型优化] 加载统计: {record}")
+        return record
+
+    def log_model_cache(self, event):
+        stats = MODEL_CACHE.stats()
+        print(f"[DD模型优化] 模型缓存{event} (命中{stats['hits']} 未命中{stats['misses']} "
+              f"淘汰{stats['evictions']} 条目{stats['entries']} 占用{stats['bytes'] / (1024**3):.2f}GB)")
+
+    def optimize_model(self, 模型文件, 智能模式, 加载模式, 优化模式, 权重缓存=False, 权重缓存上限=64.0,
+                       转换线程数=0, 模型缓存上限=0.0):
         """
         模型优化加载主函数
         Args:
@@ -143,10 +634,16 @@ class DDModelOptimizer:
             智能模式: 是否启用智能模式
             加载模式: 标准加载或分步加载
             优化模式: 禁用优化/FP8基础内存优化/FP8高速性能优化/FP8稳定质量优化
+            权重缓存: 是否将FP8转换后的权重缓存到磁盘，下次直接读取
+            权重缓存上限: 磁盘权重缓存的总大小上限(GB)，超出时删除最久未使用的缓存
+            转换线程数: 分步加载时并行转换权重的线程数，0为自动
+            模型缓存上限: 进程内复用已加载模型的内存/显存上限(GB)，0为不缓存；多个节点共用一个缓存，以最近运行的节点设置为准
         Returns:
-            优化后的模型
+            (优化后的模型, 单行JSON格式的分阶段加载统计)
         """
         start_time = time.time()
+        telemetry = LoadTelemetry()
+        cache_status = "none"
         print(f"\n开始处理模型: {模型文件}")
         print(f"处理时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
@@ -157,7 +654,8 @@ class DDModelOptimizer:
             # 如果启用智能模式，重新确定加载模式和优化模式
             if 智能模式:
                 system_info = self.get_system_info()
-                smart_options = self.determine_smart_options(system_info, model_path)
+                smart_options = self.determine_smart_options(
+                    system_info, model_path, self.resolve_convert_workers(转换线程数))
                 加载模式 = smart_options["加载模式"]
                 优化模式 = smart_options["优化模式"]
                 print("\n智能模式已启用:")
@@ -183,52 +681,85 @@ class DDModelOptimizer:
                 print("优化已禁用，使用原始加载模式")
                 needs_optimization = False
 
+            # 进程内模型缓存：相同文件和精度设置直接返回已构建的模型
+            model_key = None
+            if 模型缓存上限 > 0:
+                MODEL_CACHE.set_max_bytes(int(模型缓存上限 * (1024**3)))
+                model_key = (os.path.abspath(model_path), os.stat(model_path).st_mtime_ns,
+                             str(model_options.get("dtype")), model_options.get("fp8_optimizations", False))
+                model = MODEL_CACHE.get(model_key)
+                self.log_model_cache("命中" if model is not None else "未命中")
+                if model is not None:
+                    duration = time.time() - start_time
+                    print(f"\n模型加载完成（复用缓存）！用时: {duration:.2f}秒")
+                    return (model, self.emit_telemetry(telemetry, 模型文件, 加载模式, 优化模式,
+                                                       "memory_hit", duration))
+
+            # FP8权重缓存：命中时直接读取已转换的权重，未命中时转换后写入缓存
+            cache_path = None
+            if 权重缓存 and needs_optimization:
+                cache_path = self.get_fp8_cache_path(model_path, model_options["dtype"])
+                if 加载模式 == "标准加载":
+                    print("权重缓存需要转换后的权重，切换为分步加载")
+                    加载模式 = "分步加载"
+
             if 加载模式 == "标准加载":
                 print("使用标准加载模式...")
-                self.show_step_progress("加载模型", 0)
-                model = comfy.sd.load_diffusion_model(model_path, model_options=model_options)
-                self.show_step_progress("加载模型", 100)
+                with telemetry.phase("load", os.path.getsize(model_path)):
+                    self.show_step_progress("加载模型", 0)
+                    model = comfy.sd.load_diffusion_model(model_path, model_options=model_options)
+                    self.show_step_progress("加载模型", 100)
                 
             else:
                 print("使用分步加载模式...")
-                
-                # 第一步：加载模型文件
-                print("步骤1: 加载模型文件")
-                self.show_step_progress("加载文件", 0)
-                state_dict = comfy.utils.load_torch_file(model_path)
-                self.show_step_progress("加载文件", 100)
-                
-                # 第二步：预处理权重
-                print("\n步骤2: 预处理权重")
-                total_keys = len(state_dict)
-                processed = 0
-                update_interval = max(1, total_keys // 100)  # 确保至少显示100个更新点
-
-                if needs_optimization:  # 只在需要优化时进行处理
-                    for key, value in state_dict.items():
-                        if torch.is_tensor(value):
-                            state_dict[key] = value.to(model_options["dtype"])
-                        processed += 1
-                        if processed % update_interval == 0:
-                            progress = int(processed / total_keys * 100)
-                            self.show_step_progress("处理权重", progress)
-                self.show_step_progress("处理权重", 100)
+                target_dtype = model_options["dtype"] if needs_optimization else None
+                workers = self.resolve_convert_workers(转换线程数)
+                cache_hit = cache_path is not None and os.path.exists(cache_path)
+
+                if cache_hit:
+                    print(f"[DD模型优化] FP8权重缓存命中: {os.path.basename(cache_path)}")
+                    os.utime(cache_path)  # 更新最近使用时间
+                    cache_status = "disk_hit"
+                    state_dict, peak_memory = self.load_state_dict_stepwise(cache_path, None, workers, telemetry)
+                else:
+                    if cache_path is not None:
+                        print("[DD模型优化] FP8权重缓存未命中，本次转换后写入缓存")
+                        cache_status = "disk_miss"
+                    state_dict, peak_memory = self.load_state_dict_stepwise(model_path, target_dtype, workers, telemetry)
+                    if cache_path is not None:
+                        with telemetry.phase("cache_write") as record:
+                            self.save_fp8_cache(state_dict, cache_path, 权重缓存上限)
+                            if os.path.exists(cache_path):
+                                record["bytes"] = os.path.getsize(cache_path)
                 
                 # 第三步：创建模型
                 print("\n步骤3: 构建模型")
-                self.show_step_progress("构建模型", 0)
-                model = comfy.sd.load_diffusion_model_state_dict(state_dict, model_options)
-                self.show_step_progress("构建模型", 100)
+                with telemetry.phase("build") as record:
+                    self.show_step_progress("构建模型", 0)
+                    model = comfy.sd.load_diffusion_model_state_dict(state_dict, model_options)
+                    self.show_step_progress("构建模型", 100)
+                    if hasattr(model, "model_size"):
+                        record["bytes"] = model.model_size()
+                
+                if peak_memory is not None:
+                    peak_memory = max(peak_memory, psutil.Process().memory_info().rss / (1024**3))
+                    print(f"加载期间峰值内存占用: {peak_memory:.2f}GB")
+
+            if model_key is not None:
+                model = MODEL_CACHE.put(model_key, model)
+                self.log_model_cache("已写入")
 
             # 清理内存
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
+            with telemetry.phase("cleanup"):
+                gc.collect()
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
             
             end_time = time.time()
             duration = end_time - start_time
             print(f"\n模型加载完成！用时: {duration:.2f}秒")
-            return (model,)
+            return (model, self.emit_telemetry(telemetry, 模型文件, 加载模式, 优化模式,
+                                               cache_status, duration))
             
         except Exception as e:
             print(f"\n模型加载失败: {str(e)}")
@@ -0,0 +1,363 @@
+import math
+import warnings
+from functools import lru_cache
+
+import torch
+import torch.nn.functional as F
+
+# 支持的缩放方法
+RESIZE_METHODS = ("nearest-exact", "bilinear", "bicubic", "area", "lanczos")
+
+# 节点界面选项与缩放方法的对应关系
+RESIZE_METHOD_MAP = {
+    "邻近-精确": "nearest-exact",
+    "双线性插值": "bilinear",
+    "区域": "area",
+    "双三次插值": "bicubic",
+    "lanczos": "lanczos",
+}
+
+# Lanczos窗口半径，与cv2.INTER_LANCZOS4一致
+LANCZOS_RADIUS = 4
+
+# 高度方向重采样时，输入高度不超过滤波器长度的该倍数则改用稠密矩阵乘法
+DENSE_ROWS_TAPS_FACTOR = 8
+
+# 可分离重采样每块平面的临时内存上限
+SEPARABLE_CHUNK_BYTES = 64 * 1024**2
+
+# 宽度方向逐采样点取列加权的单位开销，相对高度方向矩阵乘法的倍数，用于选择处理顺序
+COLS_TAP_COST = 4
+
+# 宽度方向每次处理的输出字节数，所有采样点在缓存内累加完再处理下一块
+COLS_BLOCK_BYTES = 1024**2
+
+# 尺寸对齐可选的倍数，64适配潜空间下采样
+SIZE_ALIGNMENTS = (8, 16, 64)
+
+
+@lru_cache(maxsize=1024)
+def plan_limited_size(width, height, max_size, min_size, alignment=8):
+    """
+    计算限制在[min_size, max_size]内的目标尺寸，保持宽高比并向上对齐到alignment的倍数，
+    向上对齐会超过max_size时改为向下对齐
+
+    长边超过max_size时按长边缩小到max_size，小于min_size时放大到min_size，否则保持原尺寸。
+    结果按参数缓存，可供各节点共享。
+
+    Returns:
+        (新宽度, 新高度)
+    """
+    long_side = max(width, height)
+    target = max_size if long_side > max_size else min_size if long_side < min_size else None
+
+    new_width, new_height = width, height
+    if target is not None:
+        if width >= height:
+            new_width, new_height = target, int(target / (width / height))
+        else:
+            new_width, new_height = int(target * (width / height)), target
+
+    return _align_within(new_width, alignment, max_size), _align_within(new_height, alignment, max_size)
+
+
+def _align_within(value, alignment, max_size):
+    """向上对齐到alignment的倍数；超过max_size时改为向下对齐，至少保留一个倍数"""
+    aligned = (value + alignment - 1) // alignment * alignment
+    if aligned > max_size:
+        aligned = max(max_size // alignment * alignment, alignment)
+    return aligned
+
+
+def _lanczos_kernel(x):
+    return torch.where(x.abs() < LANCZOS_RADIUS,
+                       torch.sinc(x) * torch.sinc(x / LANCZOS_RADIUS),
+                       torch.zeros_like(x))
+
+
+@lru_cache(maxsize=64)
+def _filter_weights(in_size, out_size, method):
+    """
+    计算一个方向上的重采样权重（在CPU上计算并缓存）
+
+    method为"area"（覆盖面积加权，仅用于缩小）、"linear"（三角核）或"lanczos"。
+    缩小时按缩放倍数放宽滤波器支撑范围以抗锯齿，放大时使用原始核。
+    边界外的采样点复制边缘像素，与cv2的边界处理一致。
+
+    Returns:
+        (索引[out_size, K], 权重[out_size, K])
+    """
+    scale = in_size / out_size
+    centers = (torch.arange(out_size, dtype=torch.float64) + 0.5) * scale
+
+    if method == "area":
+        # 每个输出像素覆盖输入区间[i*scale, (i+1)*scale)，权重为各输入像素的覆盖比例
+        taps = int(math.ceil(scale)) + 1
+        starts = centers - scale / 2
+        first = torch.floor(starts)
+        index = first.unsqueeze(1) + torch.arange(taps, dtype=torch.float64)
+        overlap = (torch.minimum(index + 1, (starts + scale).unsqueeze(1))
+                   - torch.maximum(index, starts.unsqueeze(1)))
+        weights = overlap.clamp(min=0)
+    else:
+        radius = LANCZOS_RADIUS if method == "lanczos" else 1
+        filter_scale = max(scale, 1.0)
+        support = radius * filter_scale
+        taps = int(math.ceil(support)) * 2 + 1
+        first = torch.floor(centers - 0.5 - support) + 1
+        index = first.unsqueeze(1) + torch.arange(taps, dtype=torch.float64)
+        distance = (index + 0.5 - centers.unsqueeze(1)) / filter_scale
+        if method == "lanczos":
+            weights = _lanczos_kernel(distance)
+        else:
+            weights = (1 - distance.abs()).clamp(min=0)
+
+    weights = weights / weights.sum(dim=1, keepdim=True)
+    # 去掉对所有输出像素权重都为0的采样点
+    used = weights.abs().amax(dim=0) > 0
+    index = index[:, used].clamp(0, in_size - 1).long()
+    return index, weights[:, used].float()
+
+
+@lru_cache(maxsize=64)
+def _weight_matrix(in_size, out_size, method):
+    """将重采样权重组织为[out_size, in_size]的稀疏CSR矩阵（每行只有K个非零元素）"""
+    index, weights = _filter_weights(in_size, out_size, method)
+    rows = torch.arange(out_size).repeat_interleave(index.shape[1])
+    # 边界复制会产生重复的列索引，先合并为COO再转换；CSR在torch中仍标记为beta，屏蔽相关提示
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        matrix = torch.sparse_coo_tensor(torch.stack([rows, index.flatten()]), weights.flatten(),
+                                         (out_size, in_size), check_invariants=True).coalesce()
+        return matrix.to_sparse_csr()
+
+
+@lru_cache(maxsize=16)
+def _dense_weight_matrix(in_size, out_size, method, device, dtype):
+    """[out_size, in_size]的稠密权重矩阵，按设备和精度缓存"""
+    return _weight_matrix(in_size, out_size, method).to_dense().to(device, dtype)
+
+
+@lru_cache(maxsize=16)
+def _batched_weight_matrix(in_size, out_size, method, batch, device, dtype):
+    """将[out_size, in_size]权重矩阵复制为[batch, out_size, in_size]的批量稀疏COO矩阵，按设备和精度缓存
+
+    可分离重采样按固定平面数分块，batch通常只有分块大小和末块大小两种取值
+    """
+    index, weights = _filter_weights(in_size, out_size, method)
+    taps = index.shape[1]
+    rows = torch.arange(out_size).repeat_interleave(taps)
+    indices = torch.stack([
+        torch.arange(batch).repeat_interleave(out_size * taps),
+        rows.repeat(batch),
+        index.flatten().repeat(batch),
+    ])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        matrix = torch.sparse_coo_tensor(indices, weights.flatten().repeat(batch),
+                                         (batch, out_size, in_size), check_invariants=True)
+        return matrix.coalesce().to(device, dtype)
+
+
+def _resample_rows(planes, size, method):
+    """
+    高度方向重采样：[N, H, W]的所有平面一次左乘权重矩阵
+
+    输入高度不超过DENSE_ROWS_TAPS_FACTOR倍滤波器长度时，稠密矩阵直接按批广播相乘；
+    否则通过批量稀疏矩阵的一次torch.bmm处理所有平面，均不需要转置输入
+    """
+    in_size = planes.shape[-2]
+    taps = _filter_weights(in_size, size, method)[0].shape[1]
+    if in_size <= DENSE_ROWS_TAPS_FACTOR * taps:
+        return torch.matmul(_dense_weight_matrix(in_size, size, method, planes.device, planes.dtype), planes)
+    matrix = _batched_weight_matrix(in_size, size, method, planes.shape[0], planes.device, planes.dtype)
+    return torch.bmm(matrix, planes)
+
+
+def _resample_cols(planes, size, method, out=None):
+    """
+    宽度方向重采样：沿最后一维按K个采样点逐个取列并加权累加
+
+    所有行展平为[N*H, W]，每个采样点用index_select取出对应的列，乘以权重后累加到输出，
+    不转置、不复制输入。按COLS_BLOCK_BYTES分行块处理，一块的所有采样点在缓存内累加完成，
+    临时缓冲区只有一块大小
+    """
+    index, weights = _filter_weights(planes.shape[-1], size, method)
+    index = index.t().contiguous().to(planes.device)
+    weights = weights.t().contiguous().to(planes.device, planes.dtype)
+
+    rows = planes.reshape(-1, planes.shape[-1])
+    if out is None:
+        out = planes.new_empty(planes.shape[:-1] + (size,))
+    result = out.view(-1, size)
+    block = max(1, COLS_BLOCK_BYTES // (size * planes.element_size()))
+    gathered = rows.new_empty((min(block, rows.shape[0]), size))
+    for start in range(0, rows.shape[0], block):
+        source = rows[start:start + block]
+        target = result[start:start + block]
+        torch.index_select(source, 1, index[0], out=target)
+        target.mul_(weights[0])
+        buffer = gathered[:source.shape[0]]
+        for tap in range(1, index.shape[0]):
+            torch.index_select(source, 1, index[tap], out=buffer)
+            target.addcmul_(buffer, weights[tap])
+    return out
+
+
+def _separable_plan(in_size, size, method_h, method_w):
+    """
+    确定可分离重采样的处理顺序，尺寸不变的方向跳过，两个方向都缩放时按计算量较小的顺序处理
+
+    Returns:
+        (是否先处理高度, 中间结果的平面尺寸(H, W)，只处理一个方向时为None)
+    """
+    (in_h, in_w), (out_h, out_w) = in_size, size
+    if in_h == out_h or in_w == out_w:
+        return in_w == out_w, None
+    taps_h = _filter_weights(in_h, out_h, method_h)[0].shape[1]
+    taps_w = _filter_weights(in_w, out_w, method_w)[0].shape[1]
+    height_first = out_h * in_w * taps_h + out_h * out_w * taps_w * COLS_TAP_COST
+    width_first = in_h * out_w * taps_w * COLS_TAP_COST + out_h * out_w * taps_h
+    if height_first <= width_first:
+        return True, (out_h, in_w)
+    return False, (in_h, out_w)
+
+
+def _separable_methods(in_size, size, method):
+    """resize_bchw中各方向使用的可分离滤波器，不走可分离重采样时返回None"""
+    (in_h, in_w), (out_h, out_w) = in_size, size
+    if method == "lanczos":
+        return "lanczos", "lanczos"
+    if method == "area" and (out_h < in_h or out_w < in_w):
+        return ("area" if out_h < in_h else "linear"), ("area" if out_w < in_w else "linear")
+    return None
+
+
+def _separable_workspace(in_size, size, method_h, method_w):
+    """可分离重采样每个平面除输入和输出外的临时元素数：输入的连续化或精度转换、中间结果和写入输出前的结果"""
+    (in_h, in_w), (out_h, out_w) = in_size, size
+    _, intermediate = _separable_plan(in_size, size, method_h, method_w)
+    elements = in_h * in_w + out_h * out_w
+    if intermediate is not None:
+        elements += intermediate[0] * intermediate[1]
+    return elements
+
+
+def resize_workspace_bytes(in_size, size, method, channels=1):
+    """
+    估算resize_bchw缩放一帧时除输入和输出外的临时内存（字节），供调用方计算分块帧数
+
+    area和lanczos按可分离重采样的中间结果估算，引擎内部按平面分块，
+    不超过SEPARABLE_CHUNK_BYTES与单个平面中间结果的较大者；其他方法按一次插值的中间结果估算
+    """
+    in_w, (out_h, out_w) = in_size[1], size
+    methods = _separable_methods(in_size, size, method)
+    if methods is not None:
+        plane_bytes = _separable_workspace(in_size, size, *methods) * 4
+        return min(plane_bytes * channels, max(SEPARABLE_CHUNK_BYTES, plane_bytes))
+    if method == "nearest-exact":
+        elements = 0
+    else:
+        elements = out_h * max(in_w, out_w)
+    return elements * channels * 4
+
+
+def _resample_separable(x, size, method_h, method_w):
+    """
+    可分离重采样：高度方向乘以稀疏权重矩阵，宽度方向按采样点加权累加
+
+    按平面分块处理，每块的临时内存不超过SEPARABLE_CHUNK_BYTES（单个平面超出时每块一个平面）：
+    能容纳整帧时每块为若干整帧，否则逐帧按通道切分，分块结果直接写入预分配的输出
+    """
+    out_h, out_w = size
+    batch, channels, in_h, in_w = x.shape
+    compute_dtype = x.dtype if x.dtype in (torch.float32, torch.float64) else torch.float32
+    direct = compute_dtype == x.dtype
+    height_first, _ = _separable_plan((in_h, in_w), size, method_h, method_w)
+
+    output = torch.empty((batch, channels, out_h, out_w), dtype=x.dtype, device=x.device)
+    plane_bytes = _separable_workspace((in_h, in_w), size, method_h, method_w) * 4
+    plane_chunk = max(1, SEPARABLE_CHUNK_BYTES // max(plane_bytes, 1))
+    if plane_chunk >= channels:
+        blocks = ((slice(start, start + plane_chunk // channels), slice(None))
+                  for start in range(0, batch, plane_chunk // channels))
+    else:
+        blocks = ((slice(frame, frame + 1), slice(start, start + plane_chunk))
+                  for frame in range(batch) for start in range(0, channels, plane_chunk))
+
+    for frames, planes_slice in blocks:
+        # 先切片再展平，非连续输入（如BHWC转置而来）只复制当前块
+        planes = x[frames, planes_slice].to(compute_dtype).reshape(-1, in_h, in_w)
+        # 输出的整帧切片和单帧的通道切片都是连续的，可以直接展平写入
+        target = output[frames, planes_slice].view(-1, out_h, out_w)
+
+        if in_h == out_h and in_w == out_w:
+            result = planes
+        elif in_h == out_h:
+            result = _resample_cols(planes, out_w, method_w, out=target if direct else None)
+        elif in_w == out_w:
+            result = _resample_rows(planes, out_h, method_h)
+        elif height_first:
+            result = _resample_cols(_resample_rows(planes, out_h, method_h), out_w, method_w,
+                                    out=target if direct else None)
+        else:
+            result = _resample_rows(_resample_cols(planes, out_w, method_w), out_h, method_h)
+
+        if result is not target:
+            target.copy_(result)
+    return output
+
+
+def resize_bchw(x, size, method="bilinear"):
+    """
+    批量缩放BCHW张量，CPU和GPU通用
+
+    - nearest-exact: 与cv2.INTER_NEAREST_EXACT一致的最邻近采样
+    - bilinear / bicubic: 缩小时启用抗锯齿
+    - area: 缩小的方向按像素覆盖面积加权平均（与cv2.INTER_AREA一致），放大的方向使用线性插值
+    - lanczos: 4瓣Lanczos可分离滤波，缩小时按倍数放宽窗口抗锯齿
+
+    area和lanczos为可分离重采样：高度方向乘以稀疏权重矩阵，宽度方向按采样点加权累加，
+    按平面分块处理以限制中间结果占用的内存
+
+    bicubic和lanczos会产生过冲，结果限制在[0, 1]范围内。
+    整数倍缩小时area使用平均池化，nearest-exact使用步进切片。
+
+    Args:
+        x: [B, C, H, W]浮点张量
+        size: 目标尺寸(H, W)
+        method: RESIZE_METHODS中的一种
+    Returns:
+        [B, C, H, W]缩放结果
+    """
+    if method not in RESIZE_METHODS:
+        raise ValueError(f"不支持的缩放方法: {method}")
+
+    size = (int(size[0]), int(size[1]))
+    in_h, in_w = x.shape[-2:]
+    downscale = size[0] < in_h or size[1] < in_w
+
+    # 整数倍缩小：area等价于平均池化，nearest-exact等价于从每个块中心取样的步进切片
+    integer_factor = downscale and in_h % size[0] == 0 and in_w % size[1] == 0
+    if integer_factor and method == "area":
+        return F.avg_pool2d(x, kernel_size=(in_h // size[0], in_w // size[1]))
+    if integer_factor and method == "nearest-exact":
+        step_h, step_w = in_h // size[0], in_w // size[1]
+        return x[..., step_h // 2::step_h, step_w // 2::step_w].clone()
+
+    if method == "nearest-exact":
+        return F.interpolate(x, size=size, mode="nearest-exact")
+
+    if method == "area":
+        if not downscale:
+            return F.interpolate(x, size=size, mode="bilinear", align_corners=False)
+        return _resample_separable(x, size, *_separable_methods((in_h, in_w), size, method))
+
+    if method in ("bilinear", "bicubic"):
+        result = F.interpolate(x, size=size, mode=method, align_corners=False, antialias=downscale)
+    else:
+        result = _resample_separable(x, size, "lanczos", "lanczos")
+
+    if method in ("bicubic", "lanczos"):
+        result.clamp_(0.0, 1.0)
+    return result
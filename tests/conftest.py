@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 使测试可以直接导入 node 包中的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+import gc
+
+import pytest
+
+pytest.importorskip("comfy.sd")
+
+from node.model_optimizer import LoadedModelCache
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+
+    def model_size(self):
+        return self.size
+
+    def clone(self):
+        clone = FakeModel(self.size)
+        clone.source = self
+        return clone
+
+
+def test_lowering_budget_evicts_unused_models():
+    cache = LoadedModelCache()
+    cache.set_max_bytes(100)
+    cache.put("a", FakeModel(60))
+    gc.collect()
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 1
+
+    # 调小上限后立即生效，不需要重启
+    cache.set_max_bytes(50)
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_models_in_use_are_not_evicted_until_released():
+    cache = LoadedModelCache()
+    cache.set_max_bytes(100)
+    model = cache.put("a", FakeModel(60))
+    assert cache.in_use("a")
+
+    cache.set_max_bytes(10)
+    assert cache.get("a") is not None
+
+    del model
+    gc.collect()
+    assert not cache.in_use("a")
+    cache.evict()
+    assert cache.stats()["entries"] == 0
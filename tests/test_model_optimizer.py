@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+pytest.importorskip("comfy.sd")
+safetensors_torch = pytest.importorskip("safetensors.torch")
+
+from node.model_optimizer import DDModelOptimizer
+
+
+@pytest.mark.parametrize("dtype", [torch.float8_e4m3fn, torch.float16])
+def test_stream_load_does_not_alias_mapping(tmp_path, dtype):
+    """源精度与目标精度相同时，读取结果也必须是独立的副本，映射关闭后仍可访问"""
+    path = tmp_path / "model.safetensors"
+    source = {
+        "weight": torch.randn(64, 32).to(dtype),
+        "bias": torch.randn(32).to(dtype),
+        "steps": torch.arange(4, dtype=torch.int64),
+    }
+    safetensors_torch.save_file(source, str(path))
+
+    state_dict, _ = DDModelOptimizer().stream_load_state_dict(str(path), dtype, workers=2)
+
+    for key, tensor in source.items():
+        loaded = state_dict[key]
+        assert loaded.dtype == tensor.dtype
+        assert torch.equal(loaded.float(), tensor.float())
+        # 独立存储：可以原地修改
+        loaded.zero_()
+
+
+def test_unknown_dtype_falls_back_to_regular_loading(tmp_path):
+    """文件头中有未收录的数据类型时不流式读取，改用comfy.utils.load_torch_file加载"""
+    path = tmp_path / "model.safetensors"
+    source = {
+        "weight": torch.randn(8, 4, dtype=torch.float16),
+        "index": torch.arange(6, dtype=torch.int64).to(torch.uint16),
+    }
+    safetensors_torch.save_file(source, str(path))
+    optimizer = DDModelOptimizer()
+
+    footprint = optimizer.estimate_model_footprint(str(path))
+    assert not footprint["streamable"]
+    assert footprint["float_bytes"] == source["weight"].numel() * 2
+
+    state_dict, _ = optimizer.load_state_dict_stepwise(str(path), torch.float32)
+    assert state_dict["weight"].dtype == torch.float32
+    assert state_dict["index"].dtype == torch.uint16
+    assert torch.equal(state_dict["index"], source["index"])
+
+
+def test_convert_state_dict_matches_streaming_rule():
+    """已加载的state_dict与流式读取一样只转换浮点张量"""
+    state_dict = {
+        "weight": torch.randn(8, 4, dtype=torch.float16),
+        "index": torch.arange(6, dtype=torch.int64),
+    }
+    DDModelOptimizer().convert_state_dict(state_dict, torch.float8_e4m3fn, workers=2)
+    assert state_dict["weight"].dtype == torch.float8_e4m3fn
+    assert state_dict["index"].dtype == torch.int64
@@ -0,0 +1,21 @@
+import pytest
+
+from node.resize_utils import plan_limited_size
+
+
+@pytest.mark.parametrize("alignment", [8, 16, 64])
+def test_limited_size_never_exceeds_max(alignment):
+    for width, height in [(4000, 3000), (3000, 4000), (1000, 1000), (999, 500), (5000, 100)]:
+        new_width, new_height = plan_limited_size(width, height, 1000, 256, alignment)
+        assert max(new_width, new_height) <= 1000
+        assert new_width % alignment == 0 and new_height % alignment == 0
+
+
+def test_limited_size_snaps_down_when_rounding_up_overflows():
+    assert plan_limited_size(4000, 3000, 1000, 256, 64) == (960, 768)
+    assert plan_limited_size(4000, 3000, 1000, 256, 8) == (1000, 752)
+
+
+def test_limited_size_rounds_up_within_limit():
+    assert plan_limited_size(100, 50, 1024, 256, 64) == (256, 128)
+    assert plan_limited_size(1000, 700, 1024, 256, 64) == (1024, 704)